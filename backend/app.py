@@ -2,14 +2,15 @@ from flask import Flask, send_from_directory
 from flask_cors import CORS
 from routes.vehicle_routes import vehicle_bp
 from routes.maintenance_routes import maintenance_bp
-from components.vehicle_table import create_vehicle_table
-from components.maintenance_table import create_maintenance_table
-from components.sqs_service import create_sqs_queue  
-from components.s3_service import create_bucket, get_bucket_name  
-from components.lambda_service import create_lambda_function, add_sqs_trigger_to_lambda
 from routes.s3_routes import s3_bp  
-from components.cognito_service import setup_cognito_resources  
 from routes.auth_routes import auth_bp  
+from routes.dashboard_routes import dashboard_bp
+from routes.import_routes import import_bp
+from routes.account_routes import account_bp
+from components.pagination import NEXT_CURSOR_HEADER
+from components.outbox import start_relay_thread
+from components.provisioning import load_manifest, seed_registry, provision
+from config import MAINTENANCE_OUTBOX_ENABLED, OUTBOX_RELAY_IN_APP, OUTBOX_RELAY_INTERVAL_SECONDS, PROVISION_ON_STARTUP, STATE_MANIFEST_PATH
 import os
 import logging
 
@@ -18,44 +19,31 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 
 app = Flask(__name__, static_folder='build')
 
-# setup CORS to allow requests from frontend
-CORS(app, resources={r"/*": {"origins": "*"}})
+# setup CORS to allow requests from frontend, exposing the pagination cursor header
+CORS(app, resources={r"/*": {"origins": "*"}}, expose_headers=[NEXT_CURSOR_HEADER])
 
-# create Vehicles table and Maintenance table in DynamoDB
-create_vehicle_table()       
-create_maintenance_table()      
+# AWS resources are provisioned by 'python -m scripts.provision', which writes a state manifest
+# loading it here lets every worker start serving without control plane calls
+manifest = load_manifest()
+if manifest is None and PROVISION_ON_STARTUP:
+    manifest, _ = provision()
+if manifest is None:
+    logging.warning("No state manifest at %s - run 'python -m scripts.provision'. Resource handles will be looked up on first use.", STATE_MANIFEST_PATH)
+else:
+    seed_registry(manifest)
 
-# setup other AWS resources
-queue_name = "VehicleMaintenanceQueue" # SQS queue name
-function_name = 'GenerateReportFunction' # Lambda function name
-role_arn = 'arn:aws:iam::118706183796:role/LabRole'  # AWS role that can be assumed for comms between services
-handler = 'lambda_service.lambda_handler'  # Lambda hanlder
-
-try:
-    # create the SQS queue
-    create_sqs_queue(queue_name)
-
-    # create the S3 bucket
-    bucket_name = get_bucket_name()
-    create_bucket(bucket_name)
-
-    # create the Lambda function
-    create_lambda_function(function_name, role_arn)
-
-    # add SQS trigger to Lambda function
-    add_sqs_trigger_to_lambda(function_name)
-
-    # set up Cognito resources - user pool and app client
-    user_pool_id, user_pool_client_id = setup_cognito_resources()
-
-except Exception as e:
-    logging.error(f"An error occurred while setting up AWS resources: {e}")
+# start relaying outbox events when outbox mode is on
+if MAINTENANCE_OUTBOX_ENABLED and OUTBOX_RELAY_IN_APP:
+    start_relay_thread(OUTBOX_RELAY_INTERVAL_SECONDS)
 
 # register the routes
 app.register_blueprint(vehicle_bp)
 app.register_blueprint(maintenance_bp)
 app.register_blueprint(s3_bp)
 app.register_blueprint(auth_bp)
+app.register_blueprint(dashboard_bp)
+app.register_blueprint(import_bp)
+app.register_blueprint(account_bp)
 
 # serve react static files in the build
 @app.route('/', defaults={'path': ''})
@@ -0,0 +1,49 @@
+import threading
+import boto3
+from botocore.config import Config
+from config import (AWS_MAX_POOL_CONNECTIONS, AWS_CONNECT_TIMEOUT_SECONDS, AWS_READ_TIMEOUT_SECONDS,
+                    AWS_RETRY_MODE, AWS_MAX_ATTEMPTS, AWS_TCP_KEEPALIVE)
+
+# settings every client is created with
+CLIENT_CONFIG = Config(
+    max_pool_connections=AWS_MAX_POOL_CONNECTIONS,
+    connect_timeout=AWS_CONNECT_TIMEOUT_SECONDS,
+    read_timeout=AWS_READ_TIMEOUT_SECONDS,
+    retries={'mode': AWS_RETRY_MODE, 'max_attempts': AWS_MAX_ATTEMPTS},
+    tcp_keepalive=AWS_TCP_KEEPALIVE
+)
+
+# one client / resource per service for the whole process, created on first use
+# clients are thread safe once created, creating them is not, so creation happens under the lock
+_session = None
+_clients = {}
+_resources = {}
+_lock = threading.Lock()
+
+# helper function to get the session every client is created from
+def _get_session():
+    global _session
+    if _session is None:
+        _session = boto3.session.Session()
+    return _session
+
+# function to get the shared client of a service, e.g. get_client('s3')
+def get_client(service_name):
+    client = _clients.get(service_name)
+    if client is None:
+        with _lock:
+            client = _clients.get(service_name)
+            if client is None:
+                client = _clients[service_name] = _get_session().client(service_name, config=CLIENT_CONFIG)
+    return client
+
+# function to get the shared resource of a service, e.g. get_resource('dynamodb')
+# all tables of a resource share its client (resource.meta.client) and so one connection pool
+def get_resource(service_name):
+    resource = _resources.get(service_name)
+    if resource is None:
+        with _lock:
+            resource = _resources.get(service_name)
+            if resource is None:
+                resource = _resources[service_name] = _get_session().resource(service_name, config=CLIENT_CONFIG)
+    return resource
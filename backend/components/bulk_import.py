@@ -0,0 +1,206 @@
+import codecs
+import csv
+import json
+import time
+import uuid
+from datetime import datetime
+from maintenance_utils.calculate_next_service import calculate_next_service_date
+from components import vehicle_table, maintenance_table
+from components.outbox import write_items_with_outbox, TRANSACTION_MAX_PAIRS
+from components.maintenance_table import build_maintenance_record
+from components.vehicle_table import get_vehicle_map
+from components.event_publisher import publish_event
+from components.user_counters import add_to_counters, VEHICLE_COUNT, MAINTENANCE_COUNT
+from config import MAINTENANCE_OUTBOX_ENABLED, QUEUE_NAME
+
+# input formats understood by the importer
+FORMATS = ('csv', 'ndjson')
+# rows are written this many at a time, unknown vehicles of a maintenance chunk are fetched with one batch get
+# the counters are bumped per written chunk, so an import that stops partway leaves them matching what was stored
+CHUNK_SIZE = 100
+# rejected rows listed in the summary, the rest are only counted
+MAX_REPORTED_REJECTS = 100
+
+# fields each row type needs
+# rows are {'type': 'vehicle', 'ref', 'make', 'model', 'year'} or
+# {'type': 'maintenance', 'vehicle_id' or 'vehicle_ref', 'maintenance_type', 'mileage', 'last_service_date'}
+# 'ref' names a vehicle of this import so later maintenance rows can point at it with 'vehicle_ref'
+REQUIRED_FIELDS = {
+    'vehicle': ('make', 'model', 'year'),
+    'maintenance': ('maintenance_type', 'mileage', 'last_service_date')
+}
+
+# function to read rows one at a time from a binary stream, memory does not grow with the input
+def iter_rows(stream, input_format):
+    '''
+        yields (line number, row dict), or (line number, None) for a line that cannot be parsed
+    '''
+    lines = codecs.iterdecode(stream, 'utf-8-sig')
+    if input_format == 'csv':
+        reader = csv.DictReader(lines)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for line_number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield line_number, row if isinstance(row, dict) else None
+
+# helper function to clean a row - values as stripped strings, empty values dropped
+def normalize(row):
+    return {key.strip(): str(value).strip() for key, value in row.items()
+            if key and value is not None and str(value).strip()}
+
+# helper function to validate a row, returns the reason it is rejected or None
+def validate(row):
+    row_type = row.get('type')
+    if row_type not in REQUIRED_FIELDS:
+        return "type must be vehicle or maintenance"
+    missing = [field for field in REQUIRED_FIELDS[row_type] if field not in row]
+    if missing:
+        return f"missing {', '.join(missing)}"
+    if row_type == 'vehicle':
+        if not row['year'].isdigit():
+            return "year must be a number"
+        return None
+    if 'vehicle_id' not in row and 'vehicle_ref' not in row:
+        return "missing vehicle_id or vehicle_ref"
+    try:
+        float(row['mileage'])
+    except ValueError:
+        return "mileage must be a number"
+    try:
+        datetime.strptime(row['last_service_date'], '%Y-%m-%d')
+    except ValueError:
+        return "last_service_date must be YYYY-MM-DD"
+    return None
+
+# class holding the state of one import - writers, known vehicles and the running summary
+class BulkImport:
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.vehicles = {}  # vehicle_id -> vehicle, for the SQS messages of maintenance rows
+        self.refs = {}  # import reference -> vehicle_id
+        self.pending_vehicles = []  # vehicle items waiting for the next chunk
+        self.pending = []  # (line number, maintenance row) waiting for the next chunk
+        self.summary = {'rows': 0, 'vehicles': 0, 'maintenance_records': 0, 'rejected': 0, 'rejects': []}
+
+    def reject(self, line_number, reason):
+        self.summary['rejected'] += 1
+        if len(self.summary['rejects']) < MAX_REPORTED_REJECTS:
+            self.summary['rejects'].append({'line': line_number, 'reason': reason})
+
+    # function to import every row of a stream and return the summary
+    def run(self, stream, input_format):
+        start = time.perf_counter()
+        for line_number, row in iter_rows(stream, input_format):
+            self.summary['rows'] += 1
+            if row is None:
+                self.reject(line_number, "line is not a JSON object")
+                continue
+            row = normalize(row)
+            reason = validate(row)
+            if reason:
+                self.reject(line_number, reason)
+            elif row['type'] == 'vehicle':
+                self.add_vehicle(line_number, row)
+                if len(self.pending_vehicles) >= CHUNK_SIZE:
+                    self.flush_vehicles()
+            else:
+                self.pending.append((line_number, row))
+                if len(self.pending) >= CHUNK_SIZE:
+                    self.flush_maintenance()
+        self.flush_maintenance()
+
+        self.summary['rejects'].sort(key=lambda reject: reject['line'])  # maintenance rows are rejected a chunk later
+        elapsed = time.perf_counter() - start
+        self.summary['elapsed_seconds'] = round(elapsed, 3)
+        self.summary['rows_per_second'] = round(self.summary['rows'] / elapsed, 1) if elapsed else None
+        return self.summary
+
+    # helper function to queue a vehicle for the next vehicle chunk
+    def add_vehicle(self, line_number, row):
+        if 'ref' in row and row['ref'] in self.refs:
+            self.reject(line_number, f"duplicate ref {row['ref']}")
+            return
+        vehicle = {
+            'vehicle_id': str(uuid.uuid4()),
+            'user_id': self.user_id,
+            'make': row['make'],
+            'model': row['model'],
+            'year': row['year']
+        }
+        self.pending_vehicles.append(vehicle)
+        self.vehicles[vehicle['vehicle_id']] = vehicle
+        if 'ref' in row:
+            self.refs[row['ref']] = vehicle['vehicle_id']
+
+    # helper function to write the pending vehicles with a batch writer, 25 items per batch_write_item
+    def flush_vehicles(self):
+        if not self.pending_vehicles:
+            return
+        chunk, self.pending_vehicles = self.pending_vehicles, []
+        with vehicle_table.table.batch_writer() as vehicle_writer:
+            for vehicle in chunk:
+                vehicle_writer.put_item(Item=vehicle)
+        add_to_counters(self.user_id, **{VEHICLE_COUNT: len(chunk)})
+        self.summary['vehicles'] += len(chunk)
+
+    # helper function to validate, write and publish the pending maintenance rows as one chunk
+    def flush_maintenance(self):
+        # vehicles go first, so a stored record never points at a vehicle that is not stored yet
+        self.flush_vehicles()
+        if not self.pending:
+            return
+        chunk, self.pending = self.pending, []
+
+        # vehicles that were not imported in this run are fetched together, not one query per row
+        unknown = {row['vehicle_id'] for _, row in chunk if 'vehicle_id' in row and row['vehicle_id'] not in self.vehicles}
+        if unknown:
+            self.vehicles.update(get_vehicle_map(self.user_id, unknown))
+
+        # one next service date per distinct last service date of the chunk
+        next_dates = {}
+        records = []
+        for line_number, row in chunk:
+            vehicle_id = self.refs.get(row['vehicle_ref']) if 'vehicle_ref' in row else row['vehicle_id']
+            vehicle = self.vehicles.get(vehicle_id)
+            if vehicle is None:
+                self.reject(line_number, f"unknown vehicle {row.get('vehicle_ref') or row.get('vehicle_id')}")
+                continue
+            last_service_date = row['last_service_date']
+            if last_service_date not in next_dates:
+                next_dates[last_service_date] = calculate_next_service_date(last_service_date, 6)
+            records.append(build_maintenance_record(self.user_id, vehicle, row['maintenance_type'], row['mileage'],
+                                                    last_service_date, next_dates[last_service_date]))
+
+        if MAINTENANCE_OUTBOX_ENABLED:
+            # each record is written in the same transaction as its outbox event, like create_maintenance_record
+            for offset in range(0, len(records), TRANSACTION_MAX_PAIRS):
+                batch = records[offset:offset + TRANSACTION_MAX_PAIRS]
+                write_items_with_outbox(maintenance_table.table_name,
+                                        [(item, json.dumps(message)) for item, message in batch], QUEUE_NAME)
+                self.count_maintenance(len(batch))
+            return
+        with maintenance_table.table.batch_writer() as maintenance_writer:
+            for item, message in records:
+                maintenance_writer.put_item(Item=item)
+        # the publisher sends these as SendMessageBatch calls of up to 10 messages
+        for item, message in records:
+            publish_event(QUEUE_NAME, json.dumps(message))
+        self.count_maintenance(len(records))
+
+    # helper function to add written maintenance records to the counter and the summary
+    def count_maintenance(self, count):
+        add_to_counters(self.user_id, **{MAINTENANCE_COUNT: count})
+        self.summary['maintenance_records'] += count
+
+# function to import vehicles and maintenance history for a user from a CSV or NDJSON byte stream
+def import_rows(user_id, stream, input_format):
+    if input_format not in FORMATS:
+        raise ValueError(f"format must be one of {', '.join(FORMATS)}")
+    return BulkImport(user_id).run(stream, input_format)
@@ -0,0 +1,216 @@
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from boto3.dynamodb.conditions import Key, Attr
+from components import vehicle_table, maintenance_table, report_manifest
+from components.delete_jobs import put_job, get_job_item, claim_job, save_job, is_retryable
+from components.pagination import iter_query
+from components.s3_service import delete_report_objects, iter_object_keys
+from components.report_keys import user_reports_prefix, REPORTS_PREFIX, REPORT_NAME_MARKER
+from components.user_counters import add_to_counters, delete_user_counters, VEHICLE_COUNT, MAINTENANCE_COUNT
+from config import DELETE_JOB_WORKERS
+
+# S3 objects are deleted this many at a time, the most one delete_objects call takes
+OBJECT_BATCH_SIZE = 1000
+# progress is written to the job item at most this often, the write also serves as the job's heartbeat
+PROGRESS_SAVE_SECONDS = 5
+
+# job state lives in the DeleteJobs table, so any app worker can report it and a job cut short can be run again
+# every step only deletes what is still there, so running a job again picks up where the last run stopped
+executor = ThreadPoolExecutor(max_workers=DELETE_JOB_WORKERS, thread_name_prefix='cascade-delete')
+
+# helper function to name the worker running a job, stored on the job so another worker never saves over it
+def _new_owner():
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+# helper function to save the job's progress when the last save is long enough ago
+def _save_progress(job):
+    now = time.monotonic()
+    if now - job['saved_at'] >= PROGRESS_SAVE_SECONDS:
+        with job['lock']:
+            progress, errors = dict(job['progress']), list(job['errors'])
+        save_job(job['job_id'], job['owner'], progress, errors)
+        job['saved_at'] = now
+
+# helper function to add to the progress counters of a job
+def _progress(job, **counts):
+    with job['lock']:
+        for name, count in counts.items():
+            job['progress'][name] = job['progress'].get(name, 0) + count
+    _save_progress(job)
+
+# helper function to delete table items with a batch writer, 25 deletes per batch_write_item, returns the count
+def _delete_items(job, progress_name, table, keys):
+    deleted = 0
+    with table.batch_writer() as batch:
+        for key in keys:
+            batch.delete_item(Key=key)
+            deleted += 1
+            _progress(job, **{progress_name: 1})
+    return deleted
+
+# helper function to delete S3 objects in batches of up to 1000 keys, returns the count
+def _delete_objects(job, keys):
+    deleted_total = 0
+    batch = []
+    for key in keys:
+        batch.append(key)
+        if len(batch) == OBJECT_BATCH_SIZE:
+            deleted_total += _delete_object_batch(job, batch)
+            batch = []
+    if batch:
+        deleted_total += _delete_object_batch(job, batch)
+    return deleted_total
+
+# helper function to delete one batch of S3 objects, failures are recorded on the job
+def _delete_object_batch(job, keys):
+    deleted, errors = delete_report_objects(keys)
+    _progress(job, report_objects=deleted)
+    for key, message in errors:
+        logging.error("Failed to delete report object %s: %s", key, message)
+        with job['lock']:
+            job['errors'].append(f"{key}: {message}")
+    return deleted
+
+# helper function to list the keys of a user's maintenance records, optionally of one vehicle only
+def _maintenance_keys(user_id, vehicle_id=None):
+    query_kwargs = {
+        'KeyConditionExpression': Key('user_id').eq(user_id),
+        'ProjectionExpression': 'user_id, maintenance_id'
+    }
+    if vehicle_id:
+        query_kwargs['FilterExpression'] = Attr('vehicle_id').eq(vehicle_id)
+    for item in iter_query(maintenance_table.table, **query_kwargs):
+        yield {'user_id': item['user_id'], 'maintenance_id': item['maintenance_id']}
+
+# helper function to delete manifest entries and the objects they point at, entries are read in pages
+def _delete_reports(job, entries):
+    page = []
+    for entry in entries:
+        page.append(entry)
+        if len(page) == OBJECT_BATCH_SIZE:
+            _delete_report_page(job, page)
+            page = []
+    if page:
+        _delete_report_page(job, page)
+
+# helper function to delete one page of reports, objects first so an entry never points at nothing for long
+def _delete_report_page(job, entries):
+    _delete_objects(job, [entry['object_key'] for entry in entries])
+    _delete_items(job, 'manifest_entries', report_manifest.table,
+                  ({'user_id': entry['user_id'], 'report_id': entry['report_id']} for entry in entries))
+
+# function to delete a vehicle, its maintenance records and its reports
+def delete_vehicle_cascade(job, user_id, vehicle_id):
+    deleted = _delete_items(job, 'maintenance_records', maintenance_table.table, _maintenance_keys(user_id, vehicle_id))
+    add_to_counters(user_id, **{MAINTENANCE_COUNT: -deleted})
+    _delete_reports(job, iter_query(
+        report_manifest.table,
+        IndexName=report_manifest.VEHICLE_INDEX_NAME,
+        KeyConditionExpression=Key('user_vehicle').eq(f"{user_id}#{vehicle_id}"),
+        ProjectionExpression='user_id, report_id, object_key'
+    ))
+    # the vehicle goes last - until its history is gone it stays listed and owned, so a failed job can be run again
+    response = vehicle_table.table.delete_item(
+        Key={'vehicle_id': vehicle_id, 'user_id': user_id},
+        ReturnValues='ALL_OLD'
+    )
+    if 'Attributes' in response:
+        add_to_counters(user_id, **{VEHICLE_COUNT: -1})
+        _progress(job, vehicles=1)
+
+# function to delete everything that belongs to a user - vehicles, maintenance records, reports and counters
+def delete_account_cascade(job, user_id):
+    vehicle_keys = ({'vehicle_id': vehicle['vehicle_id'], 'user_id': user_id} for vehicle in iter_query(
+        vehicle_table.table,
+        IndexName=vehicle_table.USER_INDEX_NAME,
+        KeyConditionExpression=Key('user_id').eq(user_id)
+    ))
+    _delete_items(job, 'vehicles', vehicle_table.table, vehicle_keys)
+    _delete_items(job, 'maintenance_records', maintenance_table.table, _maintenance_keys(user_id))
+    _delete_items(job, 'manifest_entries', report_manifest.table, (
+        {'user_id': entry['user_id'], 'report_id': entry['report_id']} for entry in iter_query(
+            report_manifest.table,
+            KeyConditionExpression=Key('user_id').eq(user_id),
+            ProjectionExpression='user_id, report_id'
+        )
+    ))
+    # listing the bucket also catches objects without a manifest entry, and reports of the old flat layout
+    _delete_objects(job, iter_object_keys(user_reports_prefix(user_id)))
+    _delete_objects(job, iter_object_keys(f"{REPORTS_PREFIX}{user_id}{REPORT_NAME_MARKER}"))
+    delete_user_counters(user_id)
+
+# helper function to run a job and record how it ended
+def _run(job, function, *args):
+    try:
+        function(job, *args)
+        status = 'failed' if job['errors'] else 'done'
+    except Exception as e:
+        logging.error("Delete job %s failed: %s", job['job_id'], e)
+        with job['lock']:
+            job['errors'].append(str(e))
+        status = 'failed'
+    try:
+        save_job(job['job_id'], job['owner'], dict(job['progress']), list(job['errors']), status)
+    except Exception as e:
+        # the job stays 'running' without a heartbeat and can be run again once it is stale
+        logging.error("Could not record the end of delete job %s: %s", job['job_id'], e)
+
+# helper function to run a claimed job item in the background
+def _submit(item, owner):
+    job = {
+        'job_id': item['job_id'],
+        'owner': owner,
+        'progress': {name: int(count) for name, count in item.get('progress', {}).items()},  # a rerun adds to earlier counts
+        'errors': [],
+        'lock': threading.Lock(),
+        'saved_at': time.monotonic()
+    }
+    if item['kind'] == 'vehicle':
+        executor.submit(_run, job, delete_vehicle_cascade, item['user_id'], item['target'])
+    else:
+        executor.submit(_run, job, delete_account_cascade, item['user_id'])
+
+# helper function to store a new job and start it in the background
+def _start(user_id, kind, target):
+    owner = _new_owner()
+    item = put_job(str(uuid.uuid4()), user_id, kind, target, owner)
+    _submit(item, owner)
+    return item['job_id']
+
+# function to start deleting a vehicle and everything recorded for it, returns the job id
+def start_vehicle_delete(user_id, vehicle_id):
+    return _start(user_id, 'vehicle', vehicle_id)
+
+# function to start deleting all data of a user, returns the job id
+def start_account_delete(user_id):
+    return _start(user_id, 'account', user_id)
+
+# function to run a failed or abandoned job of the user again
+# returns True if it was started, False if it is done or still running, None if there is no such job
+def retry_job(job_id, user_id):
+    item = get_job_item(job_id)
+    if item is None or item['user_id'] != user_id:
+        return None
+    owner = _new_owner()
+    item = claim_job(job_id, owner)
+    if item is None:
+        return False
+    _submit(item, owner)
+    return True
+
+# function to get a job of the given user as shown to the client, None if there is no such job
+def get_job(job_id, user_id):
+    item = get_job_item(job_id)
+    if item is None or item['user_id'] != user_id:
+        return None
+    # numbers come back from DynamoDB as Decimal
+    job = {name: int(value) if isinstance(value, Decimal) else value for name, value in item.items() if name != 'owner'}
+    job['progress'] = {name: int(count) for name, count in item.get('progress', {}).items()}
+    job['retryable'] = is_retryable(item)
+    return job
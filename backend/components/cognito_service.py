@@ -1,36 +1,52 @@
-import boto3
+from components.aws_clients import get_client
 import logging
 from flask import request, jsonify
 from functools import wraps
 from botocore.exceptions import ClientError
+from components.token_verifier import verify_access_token, revoke_token, TokenVerificationError
+from components.resource_registry import get_handle, set_handle, invalidate, invalidate_if_missing, USER_POOL_ID, USER_POOL_CLIENT_ID
 
 # initialize the Cognito client
-cognito_client = boto3.client('cognito-idp')
+cognito_client = get_client('cognito-idp')
 
 # define names for user pool and user pool client
 USER_POOL_NAME = "VehicleAppUserPool"
 USER_POOL_CLIENT_NAME = "VehicleAppClient"
 
 # helper function to check if user pool exists, if exists return user pool id
-def get_user_pool_id():
-    response = cognito_client.list_user_pools(MaxResults=10)
-    # iterate over response until find a match to get its id
-    # response is a list of dictionaries each containing details about user pool
-    for pool in response['UserPools']:
-        if pool['Name'] == USER_POOL_NAME:
-            return pool['Id']
+def lookup_user_pool_id():
+    paginator = cognito_client.get_paginator('list_user_pools')
+    # iterate over every page until find a match to get its id
+    # each page is a list of dictionaries each containing details about user pool
+    for page in paginator.paginate(MaxResults=60):
+        for pool in page['UserPools']:
+            if pool['Name'] == USER_POOL_NAME:
+                return pool['Id']
     return None
 
 # helper function to check if user pool client exists, if exists return user pool client id
-def get_user_pool_client_id(user_pool_id):
-    response = cognito_client.list_user_pool_clients(UserPoolId=user_pool_id, MaxResults=10)
-    # iterate over response until find a match to get its id
-    # response is a list of dictionaries each containing details about user pool client
-    for client in response['UserPoolClients']:
-        if client['ClientName'] == USER_POOL_CLIENT_NAME:
-            return client['ClientId']
+def lookup_user_pool_client_id(user_pool_id):
+    paginator = cognito_client.get_paginator('list_user_pool_clients')
+    # iterate over every page until find a match to get its id
+    # each page is a list of dictionaries each containing details about user pool client
+    for page in paginator.paginate(UserPoolId=user_pool_id, MaxResults=60):
+        for client in page['UserPoolClients']:
+            if client['ClientName'] == USER_POOL_CLIENT_NAME:
+                return client['ClientId']
     return None
 
+# function to get user pool id, looked up once per process and cached in the resource registry
+def get_user_pool_id():
+    return get_handle(USER_POOL_ID, lookup_user_pool_id)
+
+# function to get user pool client id, looked up once per process and cached in the resource registry
+def get_user_pool_client_id(user_pool_id):
+    return get_handle(USER_POOL_CLIENT_ID, lambda: lookup_user_pool_client_id(user_pool_id))
+
+# helper function to drop the cached pool and client ids if cognito reports them missing
+def invalidate_cognito_handles(error):
+    return invalidate_if_missing(error, USER_POOL_ID, USER_POOL_CLIENT_ID)
+
 # function to create user pool
 def create_user_pool():
     try:
@@ -54,6 +70,7 @@ def create_user_pool():
             }
         )
         print("User Pool Created:", response['UserPool']['Id'])
+        set_handle(USER_POOL_ID, response['UserPool']['Id'])
         return response['UserPool']['Id']
     except Exception as e:
         print("Failed to create User Pool:", e)
@@ -84,13 +101,23 @@ def create_user_pool_client(user_pool_id):
                         ]  
         )
         print("User Pool Client Created:", response['UserPoolClient']['ClientId'])
+        set_handle(USER_POOL_CLIENT_ID, response['UserPoolClient']['ClientId'])
         return response['UserPoolClient']['ClientId']
     except Exception as e:
         print("Failed to create User Pool Client:", e) 
         raise
 
-# function to setup user pool and user pool client, invoked from app.py
-def setup_cognito_resources():
+# function to setup user pool and user pool client, invoked from scripts.provision
+def setup_cognito_resources(known_user_pool_id=None, known_user_pool_client_id=None):
+    # ids from a previous run are confirmed with one describe call instead of listing pools and clients
+    if known_user_pool_id and known_user_pool_client_id:
+        try:
+            cognito_client.describe_user_pool_client(UserPoolId=known_user_pool_id, ClientId=known_user_pool_client_id)
+            set_handle(USER_POOL_ID, known_user_pool_id)
+            set_handle(USER_POOL_CLIENT_ID, known_user_pool_client_id)
+            return known_user_pool_id, known_user_pool_client_id
+        except cognito_client.exceptions.ResourceNotFoundException:
+            invalidate(USER_POOL_ID, USER_POOL_CLIENT_ID)
     # create resources only if they dont exist already
     # create user pool
     user_pool_id = get_user_pool_id()
@@ -150,6 +177,7 @@ def register_user(user_pool_id, username, password, email):
     except cognito_client.exceptions.UsernameExistsException:
         return {"error": "User already exists."}
     except Exception as e:
+        invalidate_cognito_handles(e)
         logging.error("An error occurred during user registration: %s", e)
         return {"error": str(e)}
 
@@ -183,6 +211,7 @@ def login_user(user_pool_id, username, password):
     except cognito_client.exceptions.NotAuthorizedException:
         return {"error": "Invalid credentials."}
     except Exception as e:
+        invalidate_cognito_handles(e)
         logging.error("An error occurred during user login: %s", e)
         return {"error": str(e)}
 
@@ -196,18 +225,31 @@ def logout_user(access_token):
         cognito_client.global_sign_out(
             AccessToken=access_token
         )
+        revoke_token(access_token)  # local verification would still accept the signed out token until it expires
         return {"message": "User logged out successfully."}
     except Exception as e:
         logging.error("An error occurred during logout: %s", e)
         return {"error": str(e)}
 
-# function to validate token 
+# helper function to get the user pool id and client id that tokens must be issued by
+def get_verifier_ids():
+    user_pool_id = get_user_pool_id()
+    if user_pool_id is None:
+        raise TokenVerificationError("User pool not found.")
+    client_id = get_user_pool_client_id(user_pool_id)
+    if client_id is None:
+        raise TokenVerificationError("User pool client not found.")
+    return user_pool_id, client_id
+
+# function to validate token locally against the user pool's signing keys, no cognito call per request
 def validate_token(token):
-    # get user info with the access token 
+    # if the token has a 'Bearer' prefix, remove it to extract the actual token
+    if token and token.startswith("Bearer "):
+        token = token.split(" ")[1]
     try:
-        response = cognito_client.get_user(AccessToken=token)
-        return response  
-    except cognito_client.exceptions.NotAuthorizedException:
+        user_pool_id, client_id = get_verifier_ids()
+        return verify_access_token(token, cognito_client.meta.region_name, user_pool_id, client_id)
+    except TokenVerificationError:
         return None  # token is invalid
     except Exception as e:
         logging.error("Error validating token: %s", e)
@@ -222,20 +264,19 @@ def login_required(f):
         if not token:
             return jsonify({"error": "Missing token"}), 401  # unauthorized
 
-        user_info = validate_token(token)
-        if user_info is None:
+        claims = validate_token(token)
+        if claims is None:
             return jsonify({"error": "Invalid token"}), 401  # unauthorized
 
         # attach user name to request context
-        request.user = user_info['Username']  
+        request.user = claims['username']  
         return f(*args, **kwargs)
     return decorated_function
 
 # function to get user profile details using get_user
 def get_user_profile(access_token):
-    client = boto3.client('cognito-idp')
     try:
-        response = client.get_user(AccessToken=access_token)
+        response = cognito_client.get_user(AccessToken=access_token)
         return response  # Returns user attributes and details
     except ClientError as e:
         raise Exception(f"Unable to fetch user profile: {e}")
@@ -280,6 +321,7 @@ def forgot_password(user_pool_id, email):
     except cognito_client.exceptions.UserNotFoundException:
         return {"error": "User not found."}
     except Exception as e:
+        invalidate_cognito_handles(e)
         return {"error": str(e)}
 
 # function to reset password with otp verification and to accept new password
@@ -312,4 +354,5 @@ def reset_password(user_pool_id, email, otp, new_password):
     except cognito_client.exceptions.ExpiredCodeException:
         return {"error": "OTP code has expired."}
     except Exception as e:
+        invalidate_cognito_handles(e)
         return {"error": str(e)}
\ No newline at end of file
@@ -0,0 +1,113 @@
+import time
+from components.aws_clients import get_resource
+from botocore.exceptions import ClientError
+from components.table_setup import ensure_table
+
+# initialize DynamoDB client
+dynamodb = get_resource('dynamodb')
+
+# define table name
+table_name = 'DeleteJobs'
+
+# a running job saves its progress at least this often, one that has not for JOB_STALE_SECONDS is taken to be dead
+# (its worker was restarted or killed) and can be run again
+JOB_STALE_SECONDS = 120
+# errors kept on a job item, the rest are only logged - an item holds at most 400 KB
+MAX_JOB_ERRORS = 100
+
+# create the DeleteJobs table in DynamoDB, invoked from scripts.provision
+def create_delete_jobs_table():
+    try:
+        # create the table if describe_table does not find it
+        '''
+            using client.create_table with parameters
+            TableName - name of the table
+            KeySchema - one item per job, read by whichever app worker the status request lands on
+            AttributeDefinitions - describe the key schema for the table
+            BillingMode - pay per request for unpredictable workloads
+        '''
+        return ensure_table(
+            dynamodb.meta.client,
+            TableName=table_name,
+            KeySchema=[{'AttributeName': 'job_id', 'KeyType': 'HASH'}],
+            AttributeDefinitions=[{'AttributeName': 'job_id', 'AttributeType': 'S'}]
+        )
+    except ClientError as e:
+        return f"Error creating table: {e.response['Error']['Message']}"
+    except Exception as e:
+        return f"An error occurred: {str(e)}"
+
+# initialize the table
+table = dynamodb.Table(table_name)
+
+# function to store a new job, already claimed by the worker that is about to run it
+def put_job(job_id, user_id, kind, target, owner):
+    now = int(time.time())
+    job = {
+        'job_id': job_id,
+        'user_id': user_id,
+        'kind': kind,
+        'target': target,
+        'status': 'running',
+        'owner': owner,
+        'attempts': 1,
+        'progress': {},
+        'errors': [],
+        'created_at': now,
+        'started_at': now,
+        'heartbeat_at': now
+    }
+    table.put_item(Item=job, ConditionExpression="attribute_not_exists(job_id)")
+    return job
+
+# function to read a job with a strongly consistent get_item, None if there is no such job
+def get_job_item(job_id):
+    return table.get_item(Key={'job_id': job_id}, ConsistentRead=True).get('Item')
+
+# function to check whether a job may be run again - it failed, or its worker stopped saving progress
+def is_retryable(job):
+    if job['status'] == 'failed':
+        return True
+    return job['status'] == 'running' and job['heartbeat_at'] < int(time.time()) - JOB_STALE_SECONDS
+
+# function to claim a job for another run, returns the job or None if it is done or still running elsewhere
+def claim_job(job_id, owner):
+    '''
+        using table.update_item with parameters
+        ConditionExpression - only a failed job or a running one without a recent heartbeat is claimed,
+        so two workers never run the same job at once
+    '''
+    now = int(time.time())
+    try:
+        response = table.update_item(
+            Key={'job_id': job_id},
+            UpdateExpression="SET #status = :running, #owner = :owner, heartbeat_at = :now REMOVE finished_at ADD attempts :one",
+            ConditionExpression="attribute_exists(job_id) AND (#status = :failed OR (#status = :running AND heartbeat_at < :stale))",
+            ExpressionAttributeNames={'#status': 'status', '#owner': 'owner'},
+            ExpressionAttributeValues={':running': 'running', ':failed': 'failed', ':owner': owner, ':now': now,
+                                       ':stale': now - JOB_STALE_SECONDS, ':one': 1},
+            ReturnValues='ALL_NEW'
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            return None
+        raise
+    return response['Attributes']
+
+# function to save the progress of a job, raises ClientError (ConditionalCheckFailedException) once another worker took it over
+def save_job(job_id, owner, progress, errors, status=None):
+    now = int(time.time())
+    update_expression = "SET progress = :progress, errors = :errors, heartbeat_at = :now"
+    names = {'#owner': 'owner'}
+    values = {':progress': progress, ':errors': errors[-MAX_JOB_ERRORS:], ':now': now, ':owner': owner}
+    if status:
+        update_expression += ", #status = :status, finished_at = :now"
+        names['#status'] = 'status'
+        values[':status'] = status
+    table.update_item(
+        Key={'job_id': job_id},
+        UpdateExpression=update_expression,
+        ConditionExpression="#owner = :owner",
+        ExpressionAttributeNames=names,
+        ExpressionAttributeValues=values
+    )
@@ -0,0 +1,174 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+from botocore.exceptions import BotoCoreError, ClientError
+from components.sqs_service import send_sqs_message_batch
+
+# SQS accepts at most 10 entries and 256 KiB per send_message_batch call
+MAX_BATCH_SIZE = 10
+MAX_BATCH_BYTES = 256 * 1024
+# longest time an event waits for a batch to fill before it is flushed anyway
+MAX_BATCH_WAIT_SECONDS = 0.05
+# maximum number of events waiting to be published before callers fall back to sending inline
+MAX_PENDING_EVENTS = 1000
+# attempts per event before it is logged and dropped, with a short backoff between attempts
+MAX_SEND_ATTEMPTS = 3
+RETRY_BACKOFF_SECONDS = 0.1
+
+# pending (queue_name, message_body, attempts) entries, drained by a background worker thread
+_pending = queue.Queue(maxsize=MAX_PENDING_EVENTS)
+_worker = None
+_worker_lock = threading.Lock()
+_STOP = object()
+
+# counters exposed through get_stats
+_stats = {
+    'batches_sent': 0,
+    'messages_sent': 0,
+    'messages_retried': 0,
+    'messages_failed': 0,
+    'flush_seconds_total': 0.0,
+    'flush_seconds_max': 0.0
+}
+_stats_lock = threading.Lock()
+
+# helper function to send one batch for a single queue and return the entries that should be retried
+def _send_batch(queue_name, batch):
+    start = time.perf_counter()
+    retry = []
+    try:
+        failed = send_sqs_message_batch(queue_name, [body for body, attempts in batch])
+    except (ClientError, BotoCoreError, LookupError) as e:
+        # an error response, a connection error or a timeout fails the whole batch, its entries are retried
+        logging.error("Error sending batch to %s: %s", queue_name, e)
+        failed = [{'Id': str(index), 'SenderFault': False} for index in range(len(batch))]
+    elapsed = time.perf_counter() - start
+
+    # retry only the failed entries of a partial batch, sender faults (bad message) are never retried
+    for entry in failed:
+        body, attempts = batch[int(entry['Id'])]
+        if not entry.get('SenderFault') and attempts + 1 < MAX_SEND_ATTEMPTS:
+            retry.append((queue_name, body, attempts + 1))
+        else:
+            logging.error("Failed to publish event to %s: %s (%s)", queue_name, body, entry.get('Message', entry.get('Code')))
+
+    with _stats_lock:
+        _stats['batches_sent'] += 1
+        _stats['messages_sent'] += len(batch) - len(failed)
+        _stats['messages_retried'] += len(retry)
+        _stats['messages_failed'] += len(failed) - len(retry)
+        _stats['flush_seconds_total'] += elapsed
+        _stats['flush_seconds_max'] = max(_stats['flush_seconds_max'], elapsed)
+    return retry
+
+# helper function to split events by queue into batches within the SQS count and size limits, then send them
+# failed entries are re-sent until they succeed or run out of attempts
+def _flush(events):
+    retry = []
+    by_queue = {}
+    for queue_name, body, attempts in events:
+        by_queue.setdefault(queue_name, []).append((body, attempts))
+    for queue_name, entries in by_queue.items():
+        batch, batch_bytes = [], 0
+        for body, attempts in entries:
+            size = len(body.encode('utf-8'))
+            if batch and (len(batch) == MAX_BATCH_SIZE or batch_bytes + size > MAX_BATCH_BYTES):
+                retry.extend(_send_batch(queue_name, batch))
+                batch, batch_bytes = [], 0
+            batch.append((body, attempts))
+            batch_bytes += size
+        if batch:
+            retry.extend(_send_batch(queue_name, batch))
+    if retry:
+        time.sleep(RETRY_BACKOFF_SECONDS * max(attempts for queue_name, body, attempts in retry))
+        _flush(retry)
+
+# background loop - wait for the first event, collect more until the batch is full or the wait is over, then flush
+def _run():
+    stopping = False
+    while not stopping:
+        events, taken = [], 0
+        deadline = None
+        while len(events) < MAX_BATCH_SIZE:
+            if not events:
+                timeout = None  # idle, block until something arrives
+            else:
+                if deadline is None:
+                    deadline = time.monotonic() + MAX_BATCH_WAIT_SECONDS
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+            try:
+                event = _pending.get(timeout=timeout)
+            except queue.Empty:
+                break
+            taken += 1
+            if event is _STOP:
+                stopping = True
+                break
+            events.append(event)
+        try:
+            _flush(events)
+        except Exception as e:
+            logging.error("Unexpected error while publishing events: %s", e)
+        finally:
+            for _ in range(taken):
+                _pending.task_done()
+
+# helper function to start the worker thread on first use (and again after a fork)
+def _ensure_worker():
+    global _worker
+    if _worker is not None and _worker.is_alive():
+        return
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_run, name='event-publisher', daemon=True)
+            _worker.start()
+
+# function to publish an event without blocking the caller on the SQS round trip
+def publish_event(queue_name, message_body):
+    _ensure_worker()
+    try:
+        _pending.put_nowait((queue_name, message_body, 0))
+    except queue.Full:
+        # the worker is falling behind - send inline rather than drop the event
+        logging.warning("Event queue is full, publishing to %s inline.", queue_name)
+        try:
+            _flush([(queue_name, message_body, 0)])
+        except Exception as e:
+            # the record is already written, publishing must never fail the request
+            logging.error("Failed to publish event to %s inline: %s", queue_name, e)
+            with _stats_lock:
+                _stats['messages_failed'] += 1
+
+# function to wait until every queued event has been handed to SQS
+def flush():
+    if _worker is not None and _worker.is_alive():
+        _pending.join()
+
+# function to send the remaining events and stop the worker, registered to run at interpreter exit
+def shutdown():
+    if _worker is not None and _worker.is_alive():
+        _pending.put(_STOP)
+        _worker.join()
+
+# function to read the publisher counters - queue depth, batch fill ratio and flush latency
+def get_stats():
+    with _stats_lock:
+        stats = dict(_stats)
+    batches = stats['batches_sent']
+    sent = stats['messages_sent'] + stats['messages_retried'] + stats['messages_failed']
+    return {
+        'queue_depth': _pending.qsize(),
+        'batches_sent': batches,
+        'messages_sent': stats['messages_sent'],
+        'messages_retried': stats['messages_retried'],
+        'messages_failed': stats['messages_failed'],
+        'batch_fill_ratio': round(sent / (batches * MAX_BATCH_SIZE), 3) if batches else 0.0,
+        'flush_latency_avg_ms': round(stats['flush_seconds_total'] / batches * 1000, 2) if batches else 0.0,
+        'flush_latency_max_ms': round(stats['flush_seconds_max'] * 1000, 2)
+    }
+
+atexit.register(shutdown)
@@ -0,0 +1,192 @@
+import ast
+import base64
+import hashlib
+import importlib.util
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import zipfile
+
+# backend folder - module paths are resolved from here instead of the current working directory
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# handler module and the name it is deployed under (matches Handler='lambda_service.lambda_handler')
+HANDLER_MODULE = 'components.report_handler'
+HANDLER_ARCHIVE_NAME = 'lambda_service.py'
+
+# only these top level packages are bundled, boto3 and the standard library come with the lambda runtime
+BUNDLED_PACKAGES = ('components', 'maintenance_utils')
+
+# fixed timestamp and permissions so the same sources always give byte-identical zips
+FIXED_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+FILE_MODE = 0o644
+
+# helper function to find the source file of a module without importing it
+# returns None for a namespace package (a folder without __init__.py), raises ImportError if there is no python source
+def find_source(module_name):
+    if BASE_DIR not in sys.path:
+        sys.path.insert(0, BASE_DIR)
+    try:
+        spec = importlib.util.find_spec(module_name)
+    except (ImportError, ValueError) as e:
+        raise ImportError(f"Cannot resolve {module_name}: {e}")
+    if spec is None:
+        raise ImportError(f"Cannot resolve {module_name}")
+    if spec.submodule_search_locations is not None and spec.origin in (None, 'namespace'):
+        return None
+    if not spec.origin or not spec.origin.endswith('.py'):
+        raise ImportError(f"{module_name} is not a python source file ({spec.origin})")
+    return spec.origin
+
+# helper function to list the modules a source file imports as (module name, required)
+# names of "from package import name" are only candidates, they are usually functions or constants rather than submodules
+def imported_modules(source_path, module_name):
+    with open(source_path, encoding='utf-8') as source_file:
+        tree = ast.parse(source_file.read(), filename=source_path)
+    is_package = os.path.basename(source_path) == '__init__.py'
+    package = module_name if is_package else module_name.rpartition('.')[0]
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                yield alias.name, True
+        elif isinstance(node, ast.ImportFrom):
+            base = node.module or ''
+            if node.level:
+                parent = package.split('.')[:len(package.split('.')) - node.level + 1]
+                base = '.'.join(part for part in parent + [base] if part)
+            yield base, True
+            # "from package import name" may import a submodule
+            for alias in node.names:
+                yield f"{base}.{alias.name}", False
+
+# function to collect the bundled modules reachable from the handler, returns {archive path: source path}
+# raises ImportError if a bundled module cannot be found, a package missing it would only fail once deployed
+# a package that is only the parent of an imported submodule is bundled with an empty __init__.py (source path None):
+# its own __init__ may eagerly import modules the handler never uses, e.g. maintenance_utils/__init__.py pulls in
+# count_records and with it boto3, which made up most of the cold start
+def dependency_closure(entry_module=HANDLER_MODULE):
+    files = {}
+    seen = set()
+    pending = [(entry_module, 'import')]
+    while pending:
+        module_name, reached_as = pending.pop()
+        if module_name in seen or module_name.split('.')[0] not in BUNDLED_PACKAGES:
+            continue
+        try:
+            source_path = find_source(module_name)
+        except ImportError:
+            if reached_as != 'candidate':
+                raise
+            continue  # the imported name is not a submodule
+        if source_path is None:
+            seen.add(module_name)  # namespace package, nothing to bundle
+            continue
+        archive_path = module_name.replace('.', '/')
+        archive_path += '/__init__.py' if os.path.basename(source_path) == '__init__.py' else '.py'
+        # parent packages must be importable too
+        pending.extend(('.'.join(module_name.split('.')[:depth]), 'parent') for depth in range(1, module_name.count('.') + 1))
+        if reached_as == 'parent':
+            files.setdefault(archive_path, None)  # replaced by the real source if the package is imported itself
+            continue
+        seen.add(module_name)
+        files[archive_path] = source_path
+        pending.extend((name, 'import' if required else 'candidate') for name, required in imported_modules(source_path, module_name))
+    return files
+
+# function to list the files of the package in a fixed order, the handler first
+def package_files(entry_module=HANDLER_MODULE):
+    files = dependency_closure(entry_module)
+    handler_path = files.pop(entry_module.replace('.', '/') + '.py')
+    return [(HANDLER_ARCHIVE_NAME, handler_path)] + sorted(files.items())
+
+# helper function to read a bundled file, an empty package __init__.py has no source path
+def read_source(source_path):
+    if source_path is None:
+        return b''
+    with open(source_path, 'rb') as source_file:
+        return source_file.read()
+
+# function to hash the package sources, used as the on-disk cache key
+def get_source_hash(files):
+    digest = hashlib.sha256()
+    for archive_path, source_path in files:
+        content = read_source(source_path)
+        digest.update(archive_path.encode('utf-8') + b'\0')
+        digest.update(hashlib.sha256(content).digest())
+    return digest.hexdigest()
+
+# function to build the deployment zip - deterministic, the handler at the root plus only its dependency closure
+def build_package(entry_module=HANDLER_MODULE, files=None):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+        for archive_path, source_path in files or package_files(entry_module):
+            info = zipfile.ZipInfo(archive_path, date_time=FIXED_DATE_TIME)
+            info.compress_type = zipfile.ZIP_DEFLATED
+            info.external_attr = FILE_MODE << 16
+            zip_file.writestr(info, read_source(source_path))
+    return buffer.getvalue()
+
+# function to compute the hash lambda reports as CodeSha256 - base64 of the sha256 of the zip
+def get_code_sha256(zip_bytes):
+    return base64.b64encode(hashlib.sha256(zip_bytes).digest()).decode('ascii')
+
+# function to get the package from the on-disk cache, building it only when the sources changed
+def get_cached_package(cache_dir, entry_module=HANDLER_MODULE):
+    '''
+        returns (zip_bytes, code_sha256)
+        cache files are named after the source hash, so an unchanged tree never rebuilds
+    '''
+    files = package_files(entry_module)
+    cache_path = os.path.join(cache_dir, f"{entry_module.rpartition('.')[2]}-{get_source_hash(files)}.zip")
+    if os.path.exists(cache_path):
+        with open(cache_path, 'rb') as cache_file:
+            zip_bytes = cache_file.read()
+    else:
+        zip_bytes = build_package(entry_module, files)
+        os.makedirs(cache_dir, exist_ok=True)
+        # write to a temporary file first so a crash never leaves a half written zip behind
+        temp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as cache_file:
+            cache_file.write(zip_bytes)
+        os.replace(temp_path, cache_path)
+    return zip_bytes, get_code_sha256(zip_bytes)
+
+# snippet run in a fresh interpreter to time the cold start of the packaged handler
+_COLD_START_PROBE = """
+import json, sys, time
+sys.path.insert(0, sys.argv[1])
+start = time.perf_counter()
+import lambda_service
+imported = time.perf_counter()
+lambda_service.get_client('s3')
+lambda_service.get_client('dynamodb')
+lambda_service.get_executor()
+initialized = time.perf_counter()
+print(json.dumps({'import_ms': (imported - start) * 1000, 'init_ms': (initialized - imported) * 1000}))
+"""
+
+# function to time importing the packaged handler and creating its clients in a fresh interpreter
+def measure_cold_start(zip_bytes):
+    with tempfile.TemporaryDirectory() as package_dir:
+        with zipfile.ZipFile(io.BytesIO(zip_bytes)) as zip_file:
+            zip_file.extractall(package_dir)
+        # run outside the backend folder so only the packaged modules can be imported
+        env = dict(os.environ, AWS_DEFAULT_REGION=os.environ.get('AWS_DEFAULT_REGION', 'us-east-1'))
+        result = subprocess.run(
+            [sys.executable, '-c', _COLD_START_PROBE, package_dir],
+            cwd=package_dir, env=env, capture_output=True, text=True, check=True
+        )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+# function to describe a deployment zip - compressed size, uncompressed size and bundled files
+def describe_package(zip_bytes):
+    with zipfile.ZipFile(io.BytesIO(zip_bytes)) as zip_file:
+        infos = zip_file.infolist()
+    return {
+        'zip_bytes': len(zip_bytes),
+        'uncompressed_bytes': sum(info.file_size for info in infos),
+        'files': [info.filename for info in infos]
+    }
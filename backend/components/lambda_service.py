@@ -1,103 +1,64 @@
-import json
-import boto3
-import io
-import zipfile
-import os
+import logging
+from components.aws_clients import get_client
 from botocore.exceptions import ClientError
-from components.s3_service import create_bucket, upload_to_bucket, get_bucket_name
-from components.sqs_service import get_sqs_queue_url
+from components.s3_service import create_bucket, get_bucket_name
+from components.report_manifest import table_name as report_manifest_table_name
+from components.lambda_package import get_cached_package, describe_package
+from components.sqs_service import get_sqs_queue_arn
+from config import REPORT_BATCH_SIZE, REPORT_BATCH_WINDOW_SECONDS, REPORT_WORKERS, LAMBDA_BUILD_CACHE_DIR, QUEUE_NAME, REPORT_AGGREGATION
 
-# initialize the boto3 clients for lambda and sqs
-lambda_client = boto3.client('lambda')
-sqs_client = boto3.client('sqs')
+# initialize the boto3 client for lambda
+lambda_client = get_client('lambda')
 
-# lambda handler function code as a string
-lambda_code = """
-import json
-import boto3
-from components.s3_service import upload_to_bucket, get_bucket_name
-from maintenance_utils.report_generation import generate_report
-from datetime import datetime
+# get the zip containing the Lambda handler and only the modules it imports, rebuilt only when sources change
+def get_lambda_package():
+    zip_bytes, code_sha256 = get_cached_package(LAMBDA_BUILD_CACHE_DIR)
+    package = describe_package(zip_bytes)
+    logging.info("Lambda package: %d bytes zipped, %d files, CodeSha256 %s", package['zip_bytes'], len(package['files']), code_sha256)
+    return zip_bytes, code_sha256
 
-def lambda_handler(event, context):
-    print("Raw event received:", json.dumps(event))
-    s3 = boto3.client('s3')
-    bucket_name = get_bucket_name()
-    
-    for record in event['Records']:
-        print("Record before parsing:", record)
-        try:
-            message_body = json.loads(record['body'])
-            print("Parsed message body:", message_body)  # Log the parsed message body
-        except json.JSONDecodeError as e:
-            print("JSONDecodeError:", e)
-            return {
-                'statusCode': 400,
-                'body': 'Failed to decode message body as JSON'
-            }
-        
-        vehicle_id = message_body['vehicle_id']
-        user_id = message_body['user_id']  # Extract user ID from the message body
-        make = message_body['make']
-        model = message_body['model']
-        year = message_body['year']
-        maintenance_type = message_body['maintenance_type']
-        mileage = message_body['mileage']
-        last_service_date = message_body['last_service_date']
-        next_service_date = message_body['next_service_date']
-        
-        report = generate_report(
-            {'make': make, 'model': model, 'year': year},
-            {'maintenance_type': maintenance_type, 'mileage': mileage, 'last_service_date': last_service_date, 'next_service_date': next_service_date}
-        )
-        
-        # Prepare a unique object name with user_id and timestamp
-        timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
-        print("Generated report data:", report)  # Debug log for generated report
-        object_name = f'reports/{user_id}_maintenance_report_{timestamp}.json'  # Include user_id in the report name
-        upload_message = upload_to_bucket(object_name, json.dumps(report), bucket_name)
-        print("Upload response:", upload_message)  # Debug log for S3 upload
-    
-    return {
-        'statusCode': 200,
-        'body': 'Report generated and stored successfully!'
-    }
-"""
-
-# create in-memory zip file containing the Lambda function code and all required components
+# create in-memory zip file containing the Lambda handler and only the modules it imports
 def get_lambda_zip_bytes():
+    return get_lambda_package()[0]
 
-    # create an in-memory bytes buffer
-    buffer = io.BytesIO()
-
-    # create a zip file and add the lambda code and necessary components
-    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-        # add the lambda function code to the root of the zip file
-        zip_file.writestr('lambda_service.py', lambda_code)
+# function to get the environment variables the report handler reads
+def get_lambda_environment():
+    return {
+        'REPORT_WORKERS': str(REPORT_WORKERS),
+        'REPORT_BUCKET': get_bucket_name(),
+        'REPORT_MANIFEST_TABLE': report_manifest_table_name,
+        'REPORT_AGGREGATION': REPORT_AGGREGATION
+    }
 
-        # add the components directory and its contents
-        for folder_name, subfolders, filenames in os.walk('components'):
-            for filename in filenames:
-                file_path = os.path.join(folder_name, filename)
-                # write the file with the correct relative path
-                zip_file.write(file_path, os.path.relpath(file_path, os.path.dirname('components')))
+# function to bring the handler's environment variables up to date on an existing function
+def update_lambda_environment(function_name, configuration):
+    environment = get_lambda_environment()
+    if configuration.get('Environment', {}).get('Variables') == environment:
+        return
+    lambda_client.update_function_configuration(FunctionName=function_name, Environment={'Variables': environment})
+    # a code update is rejected while the configuration update is still in progress
+    lambda_client.get_waiter('function_updated').wait(FunctionName=function_name)
 
-        # add maintenance_utils directory and its contents
-        for folder_name, subfolders, filenames in os.walk('maintenance_utils'):
-            for filename in filenames:
-                file_path = os.path.join(folder_name, filename)
-                zip_file.write(file_path, os.path.relpath(file_path, os.path.dirname('maintenance_utils')))
-    
-    # get the byte content of the zip file
-    buffer.seek(0)
-    return buffer.read()
+# function to upload new code only when its hash differs from the deployed CodeSha256
+def update_lambda_code(function_name, deployed_code_sha256):
+    zip_bytes, code_sha256 = get_lambda_package()
+    if code_sha256 == deployed_code_sha256:
+        return f"Lambda function '{function_name}' is up to date."
+    '''
+        using client.update_function_code with parameters
+        FunctionName - name of the function
+        ZipFile - the new deployment package
+    '''
+    lambda_client.update_function_code(FunctionName=function_name, ZipFile=zip_bytes)
+    return f"Lambda function '{function_name}' code updated."
 
-# function to create lambda function, invoked from app.py
+# function to create lambda function, invoked from scripts.provision
 def create_lambda_function(function_name, role_arn):
-    # check if lambda function already exists
+    # check if lambda function already exists, if so ship the code only when it changed
     try:
         response = lambda_client.get_function(FunctionName=function_name)
-        return f"Lambda function '{function_name}' already exists."
+        update_lambda_environment(function_name, response['Configuration'])
+        return update_lambda_code(function_name, response['Configuration']['CodeSha256'])
     except ClientError as e:
         if e.response['Error']['Code'] == 'ResourceNotFoundException':
             # retrieve the zip byte string
@@ -114,6 +75,7 @@ def create_lambda_function(function_name, role_arn):
                 Description - description of the function
                 Timeout - time in seconds for function runtime
                 MemorySize - memory available to function at runtime
+                Environment - records processed concurrently per batch, the report bucket and manifest table
             '''
             response = lambda_client.create_function(
                 FunctionName=function_name,
@@ -123,7 +85,8 @@ def create_lambda_function(function_name, role_arn):
                 Code={'ZipFile': zip_bytes},
                 Description='Lambda function to generate reports',
                 Timeout=30,
-                MemorySize=128
+                MemorySize=128,
+                Environment={'Variables': get_lambda_environment()}
             )
             # get s3 bucket name and create bucket
             bucket_name = get_bucket_name()
@@ -132,28 +95,40 @@ def create_lambda_function(function_name, role_arn):
         else:
             return f"Error creating Lambda function: {e.response['Error']['Message']}"
 
+# helper function to get the event source mapping settings, sqs needs a batching window for batches over 10
+def get_batch_settings(batch_size=REPORT_BATCH_SIZE, batch_window=REPORT_BATCH_WINDOW_SECONDS):
+    if batch_size > 10:
+        batch_window = max(batch_window, 1)
+    return {
+        'BatchSize': batch_size,
+        'MaximumBatchingWindowInSeconds': batch_window,
+        'FunctionResponseTypes': ['ReportBatchItemFailures']
+    }
+
 # function to add sqs as a trigger to lambda
-def add_sqs_trigger_to_lambda(function_name, queue_name="VehicleMaintenanceQueue"):
+def add_sqs_trigger_to_lambda(function_name, queue_name=QUEUE_NAME, batch_size=REPORT_BATCH_SIZE, batch_window=REPORT_BATCH_WINDOW_SECONDS):
     try:
-        # get the SQS queue url
-        queue_url = get_sqs_queue_url(queue_name)
-        
-        # get the ARN of the SQS queue
-        queue_attributes = sqs_client.get_queue_attributes(
-            QueueUrl=queue_url,
-            AttributeNames=['QueueArn']
-        )
-        queue_arn = queue_attributes['Attributes']['QueueArn']
+        # get the ARN of the SQS queue from the resource registry
+        queue_arn = get_sqs_queue_arn(queue_name)
+        if queue_arn is None:
+            return f"Error adding SQS trigger: queue '{queue_name}' not found."
+
+        settings = get_batch_settings(batch_size, batch_window)
 
         # list existing event source mappings for the Lambda function
         mappings = lambda_client.list_event_source_mappings(
-            FunctionName=function_name
+            FunctionName=function_name,
+            EventSourceArn=queue_arn
         )
 
-        # check if the SQS trigger already exists
+        # if the SQS trigger already exists, bring its batch settings up to date
         for mapping in mappings['EventSourceMappings']:
-            if mapping['EventSourceArn'] == queue_arn:
+            if mapping['EventSourceArn'] != queue_arn:
+                continue
+            if all(mapping.get(key) == value for key, value in settings.items()):
                 return f"SQS trigger already exists for Lambda function '{function_name}'."
+            lambda_client.update_event_source_mapping(UUID=mapping['UUID'], **settings)
+            return f"SQS trigger updated for Lambda function '{function_name}'."
 
         # create the event source mapping if it does not exist
         '''
@@ -162,12 +137,14 @@ def add_sqs_trigger_to_lambda(function_name, queue_name="VehicleMaintenanceQueue
             FunctionName -  name of the function
             Enabled - if true event source mapping is active
             BatchSize - no. of records that lambda pulls from sqs queue in each batch
+            MaximumBatchingWindowInSeconds - time lambda waits to fill a batch
+            FunctionResponseTypes - lets the handler return batchItemFailures so only failed messages are retried
         '''
         lambda_client.create_event_source_mapping(
             EventSourceArn=queue_arn,
             FunctionName=function_name,
             Enabled=True,
-            BatchSize=1,  
+            **settings
         )
         return f"SQS trigger added to Lambda function '{function_name}'."
     except ClientError as e:
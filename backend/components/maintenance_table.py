@@ -1,40 +1,55 @@
 import logging
-import boto3
+from components.aws_clients import get_resource
 import json
 from botocore.exceptions import ClientError
 import uuid  # Importing the UUID module
+from datetime import date, timedelta
 from maintenance_utils.calculate_next_service import calculate_next_service_date
 from components.vehicle_table import get_vehicle  # Import the function to get vehicle data
-from components.sqs_service import send_sqs_message, get_sqs_queue_url  # Import your SQS message sending function
+from components.event_publisher import publish_event  # publishes SQS messages off the request path
+from components.outbox import write_with_outbox
+from components.table_setup import ensure_table
+from components.user_counters import add_to_counters, MAINTENANCE_COUNT
+from config import MAINTENANCE_OUTBOX_ENABLED, QUEUE_NAME
 from boto3.dynamodb.conditions import Key
-import time
+from components.pagination import query_page
 
 logging.basicConfig(level=logging.INFO)
 
 # initialize DynamoDB client
-dynamodb = boto3.resource('dynamodb')
+dynamodb = get_resource('dynamodb')
 
 # define table name
 table_name = 'Maintenance'
 
-# create the Maintenance table in DynamoDB, invoked from app.py
+# global secondary index ordering a user's records by next_service_date (YYYY-MM-DD, so string order is date order)
+NEXT_SERVICE_INDEX_NAME = 'user_id-next_service_date-index'
+NEXT_SERVICE_INDEX = {
+    'IndexName': NEXT_SERVICE_INDEX_NAME,
+    'KeySchema': [
+        {'AttributeName': 'user_id', 'KeyType': 'HASH'},
+        {'AttributeName': 'next_service_date', 'KeyType': 'RANGE'}
+    ],
+    'Projection': {'ProjectionType': 'ALL'}
+}
+# attributes of a LastEvaluatedKey from the next_service_date index, table key plus index key
+NEXT_SERVICE_CURSOR_KEYS = ('user_id', 'maintenance_id', 'next_service_date')
+
+# create the Maintenance table in DynamoDB, invoked from scripts.provision
 def create_maintenance_table():
     try:
-        # Check if the table already exists
-        existing_tables = dynamodb.tables.all()
-        if table_name in [table.name for table in existing_tables]:
-            return "Table already exists."
-        
-        # create the table
+        # create the table if describe_table does not find it
         '''
             using client.create_table with parameters
             TableName - name of the table
             KeySchema - list of dictionaries - define partition key and sort key
-            AttributeDefinitions - describe the key schema for the table
+            AttributeDefinitions - describe the key schema for the table and the index
+            GlobalSecondaryIndexes - next_service_date index so upcoming maintenance is a range query
             BillingMode - controls how you are charged for read and write throughput 
                         - using pay per request for unpredictable workloads
         '''
-        table = dynamodb.create_table(
+        return ensure_table(
+            dynamodb.meta.client,
             TableName=table_name,
             KeySchema=[
                 {'AttributeName': 'user_id', 'KeyType': 'HASH'},  # partition key to organize records per user
@@ -42,11 +57,11 @@ def create_maintenance_table():
             ],
             AttributeDefinitions=[
                 {'AttributeName': 'user_id', 'AttributeType': 'S'}, 
-                {'AttributeName': 'maintenance_id', 'AttributeType': 'S'} 
+                {'AttributeName': 'maintenance_id', 'AttributeType': 'S'},
+                {'AttributeName': 'next_service_date', 'AttributeType': 'S'}
             ],
-            BillingMode='PAY_PER_REQUEST'
+            GlobalSecondaryIndexes=[NEXT_SERVICE_INDEX]
         )
-        return f"Table created. Status: {table.table_status}"
     except ClientError as e:
         return f"Error creating table: {e.response['Error']['Message']}"
     except Exception as e:
@@ -55,87 +70,134 @@ def create_maintenance_table():
 # initialize the table
 table = dynamodb.Table(table_name)
 
+# function to build a maintenance item and the SQS message that turns it into a report
+def build_maintenance_record(user_id, vehicle_data, maintenance_type, mileage, last_service_date, next_service_date):
+    vehicle_id = vehicle_data['vehicle_id']
+    maintenance_id = str(uuid.uuid4())  # generate a unique id for maintenance record
+
+    item = {
+        'user_id': user_id,
+        'maintenance_id': maintenance_id,
+        'vehicle_id': vehicle_id,
+        'maintenance_type': maintenance_type,
+        'mileage': mileage,
+        'last_service_date': last_service_date,
+        'next_service_date': next_service_date  # store the next service date
+    }
+
+    # Prepare the message for SQS
+    message = {
+        'user_id': user_id,
+        'vehicle_id': vehicle_id,
+        'make': vehicle_data.get("make", "Unknown"),
+        'model': vehicle_data.get("model", "Unknown"),
+        'year': vehicle_data.get("year", "Unknown"),
+        'maintenance_type': maintenance_type,
+        'mileage': mileage,
+        'last_service_date': last_service_date,
+        'next_service_date': next_service_date
+    }
+    return item, message
+
 # function to create maintenance record in the DynamoDB table
 def create_maintenance_record(user_id, vehicle_id, maintenance_type, mileage, last_service_date):
     
-    # Check if the vehicle exists before proceeding
-    existing_vehicle_response = get_vehicle(vehicle_id)
-    if 'error' in existing_vehicle_response:
-        print(f"Error: {existing_vehicle_response['error']}. Vehicle not found.")
+    # Check if the vehicle exists before proceeding, the result is reused for the SQS message
+    vehicle_data = get_vehicle(vehicle_id)
+    if 'error' in vehicle_data:
+        print(f"Error: {vehicle_data['error']}. Vehicle not found.")
         return {"error": "Vehicle not found."}, 404  # Return 404 if the vehicle doesn't exist
-   
-    maintenance_id = str(uuid.uuid4())  # generate a unique id for maintenance record
 
     # calculate the next service date using the published library
     # args - last_service_date, months
     next_service_date = calculate_next_service_date(last_service_date, 6)
+    item, message = build_maintenance_record(user_id, vehicle_data, maintenance_type, mileage, last_service_date, next_service_date)
 
-    # Add a new maintenance record to the Maintenance table
-    '''
-        using client.put_item with parameters
-        Item - dictionary of given attributes 
-    '''
     try:
-        table.put_item(
-            Item={
-                'user_id': user_id,
-                'maintenance_id': maintenance_id,
-                'vehicle_id': vehicle_id,
-                'maintenance_type': maintenance_type,
-                'mileage': mileage,
-                'last_service_date': last_service_date,
-                'next_service_date': next_service_date  # store the next service date
-            }
-        )
-        time.sleep(1)
-        
-        # retrieve vehicle data, passing user_id
-        vehicle_data_response = get_vehicle(vehicle_id)
-        
-        # Check if the vehicle exists
-        if 'error' in vehicle_data_response:
-            print(f"Error: {vehicle_data_response['error']}. Vehicle not found.")
-            return {"error": "Vehicle not found."}, 404  # Return 404 if the vehicle doesn't exist
-
-        vehicle_data = vehicle_data_response
-
-        # Prepare the message for SQS
-        message = {
-            'user_id': user_id,
-            'vehicle_id': vehicle_id,
-            'make': vehicle_data.get("make", "Unknown"),
-            'model': vehicle_data.get("model", "Unknown"),
-            'year': vehicle_data.get("year", "Unknown"),
-            'maintenance_type': maintenance_type,
-            'mileage': mileage,
-            'last_service_date': last_service_date,
-            'next_service_date': next_service_date
-        }
-
-        # fetch the queue URL
-        queue_url = get_sqs_queue_url('VehicleMaintenanceQueue')
-
-        # Send the message to SQS
-        send_sqs_message(queue_url, json.dumps(message))  # Send the message as a JSON string
+        if MAINTENANCE_OUTBOX_ENABLED:
+            # write the record and its outbox event in one transaction, the outbox relay sends it to SQS
+            write_with_outbox(table_name, item, QUEUE_NAME, json.dumps(message),
+                              condition_expression='attribute_not_exists(maintenance_id)')
+        else:
+            # Add a new maintenance record to the Maintenance table
+            '''
+                using client.put_item with parameters
+                Item - dictionary of given attributes 
+            '''
+            table.put_item(Item=item)
+
+            # Queue the message for SQS, the response returns right after the DynamoDB write
+            publish_event(QUEUE_NAME, json.dumps(message))  # Send the message as a JSON string
 
+        add_to_counters(user_id, **{MAINTENANCE_COUNT: 1})
         return {"message": "Maintenance record added successfully."}, 201 
     except ClientError as e:
         return {"error": f"Error creating maintenance record: {e.response['Error']['Message']}"}, 500  # HTTP status code for server error
 
-# function to get all maintenance records associated with specific user
-def get_all_maintenance_records(user_id):
-
+# function to get the maintenance records of a specific user ordered by next_service_date
+def get_all_maintenance_records(user_id, page_size=None, start_key=None, descending=False):
+    '''
+        using table.query on the next_service_date index, two things differ from reading the base table
+        - the index is sparse, a record without next_service_date is not listed (every record written
+          through build_maintenance_record has one, only items stored some other way can lack it)
+        - index reads are eventually consistent, a record created a moment ago can be missing from the
+          next listing for a short while (ConsistentRead is not supported on global secondary indexes)
+    '''
     try:
-        # perform the query
-        response = table.query(
-            KeyConditionExpression=Key('user_id').eq(user_id)
+        # DynamoDB returns the records already sorted
+        # page_size None returns every page, so long histories are no longer cut off at 1 MB
+        items, next_cursor = query_page(
+            table,
+            page_size=page_size,
+            start_key=start_key,
+            IndexName=NEXT_SERVICE_INDEX_NAME,
+            KeyConditionExpression=Key('user_id').eq(user_id),
+            ScanIndexForward=not descending
         )
-        # Check if there are any items returned
-        if 'Items' in response:
-            return {"items": response['Items']}
-        else:
-            return {"items": []} 
+        return {"items": items, "next_cursor": next_cursor}
     except ClientError as e:
         return {"error": f"Error retrieving maintenance records: {e.response['Error']['Message']}"}
     except Exception as e:
-        return {"error": str(e)}
\ No newline at end of file
+        return {"error": str(e)}
+
+# helper function to build the key condition selecting a user's records due within the next days
+def upcoming_key_condition(user_id, days):
+    today = date.today()
+    return Key('user_id').eq(user_id) & Key('next_service_date').between(
+        today.isoformat(), (today + timedelta(days=days)).isoformat()
+    )
+
+# function to count a user's records due within the next days, reads only the matching index entries
+def count_upcoming_maintenance_records(user_id, days):
+    '''
+        using table.query with parameters
+        IndexName - next_service_date index
+        KeyConditionExpression - user and date range
+        Select - COUNT, only the number of matches comes back; pages are followed past 1 MB
+    '''
+    query_kwargs = {
+        'IndexName': NEXT_SERVICE_INDEX_NAME,
+        'KeyConditionExpression': upcoming_key_condition(user_id, days),
+        'Select': 'COUNT'
+    }
+    count = 0
+    while True:
+        response = table.query(**query_kwargs)
+        count += response['Count']
+        if 'LastEvaluatedKey' not in response:
+            return count
+        query_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+# function to list a user's records due within the next days, soonest first
+def get_upcoming_maintenance_records(user_id, days, page_size=None, start_key=None):
+    try:
+        items, next_cursor = query_page(
+            table,
+            page_size=page_size,
+            start_key=start_key,
+            IndexName=NEXT_SERVICE_INDEX_NAME,
+            KeyConditionExpression=upcoming_key_condition(user_id, days)
+        )
+        return {'items': items, 'next_cursor': next_cursor}
+    except ClientError as e:
+        return {"error": f"Error retrieving upcoming maintenance records: {e.response['Error']['Message']}"}
@@ -0,0 +1,266 @@
+import logging
+import os
+import random
+import socket
+import threading
+import time
+import uuid
+from components.aws_clients import get_resource
+from botocore.exceptions import BotoCoreError, ClientError
+from boto3.dynamodb.conditions import Key
+from components.sqs_service import send_sqs_message_batch
+from components.table_setup import ensure_table
+
+# initialize DynamoDB client
+dynamodb = get_resource('dynamodb')
+
+# define table name
+table_name = 'MaintenanceOutbox'
+
+# pending events are spread over this many partitions so maintenance writes do not all land on one hash key
+PENDING_SHARDS = 8
+# partition of events written before the outbox was sharded, still drained by the relay
+LEGACY_PENDING_PARTITION = 'pending'
+# item holding the relay lease
+LEASE_KEY = {'partition': 'checkpoint', 'event_id': 'relay'}
+
+# item / event pairs per transaction, transact_write_items takes at most 100 items
+TRANSACTION_MAX_PAIRS = 50
+
+# SQS batch size and number of batches relayed per partition and lease
+RELAY_BATCH_SIZE = 10
+RELAY_BATCHES_PER_PARTITION = 5
+# an event SQS rejected this many times, or rejected as the sender's fault (e.g. too large), is moved to the
+# dead-letter partition with its last error, so it is kept for inspection but no longer read by the relay
+RELAY_MAX_ATTEMPTS = 10
+DEAD_LETTER_PARTITION = 'dead-letter'
+# only one relay (across all app workers) holds the lease at a time
+RELAY_LEASE_SECONDS = 30
+
+# create the MaintenanceOutbox table in DynamoDB, invoked from scripts.provision
+def create_outbox_table():
+    try:
+        # create the table if describe_table does not find it
+        '''
+            using client.create_table with parameters
+            TableName - name of the table
+            KeySchema - partition is one of the pending shards, event_id sorts its events by creation time
+            AttributeDefinitions - describe the key schema for the table
+            BillingMode - pay per request for unpredictable workloads
+        '''
+        return ensure_table(
+            dynamodb.meta.client,
+            TableName=table_name,
+            KeySchema=[
+                {'AttributeName': 'partition', 'KeyType': 'HASH'},
+                {'AttributeName': 'event_id', 'KeyType': 'RANGE'}
+            ],
+            AttributeDefinitions=[
+                {'AttributeName': 'partition', 'AttributeType': 'S'},
+                {'AttributeName': 'event_id', 'AttributeType': 'S'}
+            ]
+        )
+    except ClientError as e:
+        return f"Error creating table: {e.response['Error']['Message']}"
+    except Exception as e:
+        return f"An error occurred: {str(e)}"
+
+# initialize the table
+table = dynamodb.Table(table_name)
+
+# function to build a time ordered event id - zero padded epoch millis followed by a uuid
+def new_event_id():
+    return f"{int(time.time() * 1000):013d}#{uuid.uuid4()}"
+
+# function to get the name of a pending shard
+def pending_partition(shard):
+    return f"pending#{shard}"
+
+# partitions the relay walks, the legacy one first as it holds the oldest events
+PENDING_PARTITIONS = [LEGACY_PENDING_PARTITION] + [pending_partition(shard) for shard in range(PENDING_SHARDS)]
+
+# function to build a pending outbox event item on a random shard
+def outbox_event(queue_name, message_body):
+    return {
+        'partition': pending_partition(random.randrange(PENDING_SHARDS)),
+        'event_id': new_event_id(),
+        'queue_name': queue_name,
+        'message_body': message_body
+    }
+
+# function to write an item and its outbox event atomically
+def write_with_outbox(item_table_name, item, queue_name, message_body, condition_expression=None):
+    '''
+        using client.transact_write_items with parameters
+        TransactItems - Put of the business item and Put of the outbox event, both succeed or neither does
+    '''
+    item_put = {'TableName': item_table_name, 'Item': item}
+    if condition_expression:
+        item_put['ConditionExpression'] = condition_expression
+    event = outbox_event(queue_name, message_body)
+    dynamodb.meta.client.transact_write_items(
+        TransactItems=[
+            {'Put': item_put},
+            {'Put': {'TableName': table_name, 'Item': event}}
+        ]
+    )
+    return event['event_id']
+
+# function to write up to TRANSACTION_MAX_PAIRS items, each with its outbox event, in one transaction
+def write_items_with_outbox(item_table_name, items, queue_name):
+    '''
+        items - (item, message body) pairs
+        using client.transact_write_items with parameters
+        TransactItems - Put of each item and Put of its outbox event, all of them succeed or none does
+    '''
+    if len(items) > TRANSACTION_MAX_PAIRS:
+        raise ValueError(f"At most {TRANSACTION_MAX_PAIRS} items can be written in one transaction.")
+    transact_items = []
+    for item, message_body in items:
+        transact_items.append({'Put': {'TableName': item_table_name, 'Item': item}})
+        transact_items.append({'Put': {'TableName': table_name, 'Item': outbox_event(queue_name, message_body)}})
+    dynamodb.meta.client.transact_write_items(TransactItems=transact_items)
+
+# helper function to take or renew the relay lease, returns False when another relay holds it
+def acquire_lease(owner):
+    now = int(time.time())
+    try:
+        table.update_item(
+            Key=LEASE_KEY,
+            UpdateExpression="SET #owner = :owner, lease_until = :until",
+            ConditionExpression="attribute_not_exists(lease_until) OR lease_until < :now OR #owner = :owner",
+            ExpressionAttributeNames={'#owner': 'owner'},
+            ExpressionAttributeValues={':owner': owner, ':until': now + RELAY_LEASE_SECONDS, ':now': now}
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            return False
+        raise
+    return True
+
+# helper function to send events to one queue, returns (sent events, [(event, error, sender fault)])
+def send_events(queue_name, events):
+    '''
+        a connection error or timeout raises BotoCoreError, it says nothing about the events themselves
+    '''
+    try:
+        failed = send_sqs_message_batch(queue_name, [event['message_body'] for event in events])
+    except (ClientError, LookupError) as e:
+        if len(events) == 1:
+            return [], [(events[0], str(e), False)]
+        # a rejected batch (e.g. over 256 KiB) is sent again one event at a time, so only the bad event is charged
+        logging.error("Error relaying outbox events to %s, sending them one by one: %s", queue_name, e)
+        sent, failures = [], []
+        for event in events:
+            event_sent, event_failures = send_events(queue_name, [event])
+            sent.extend(event_sent)
+            failures.extend(event_failures)
+        return sent, failures
+    failed_by_index = {int(entry['Id']): entry for entry in failed}
+    sent = [event for index, event in enumerate(events) if index not in failed_by_index]
+    failures = [(events[index], entry.get('Message', entry.get('Code', '')), bool(entry.get('SenderFault')))
+                for index, entry in failed_by_index.items()]
+    return sent, failures
+
+# helper function to send one batch of outbox events, returns (sent events, [(event, error, sender fault)])
+def relay_batch(events):
+    sent = []
+    failures = []
+    by_queue = {}
+    for event in events:
+        by_queue.setdefault(event['queue_name'], []).append(event)
+    for queue_name, queue_events in by_queue.items():
+        try:
+            queue_sent, queue_failures = send_events(queue_name, queue_events)
+        except BotoCoreError as e:
+            # SQS could not be reached, the events stay pending without being charged an attempt
+            logging.error("Error relaying outbox events to %s: %s", queue_name, e)
+            continue
+        sent.extend(queue_sent)
+        failures.extend(queue_failures)
+    return sent, failures
+
+# helper function to move an event to the dead-letter partition, the put and the delete happen in one transaction
+def dead_letter(event, error):
+    logging.error("Moving outbox event %s to %s after %s attempts: %s",
+                  event['event_id'], DEAD_LETTER_PARTITION, int(event.get('attempts', 0)) + 1, error)
+    dynamodb.meta.client.transact_write_items(
+        TransactItems=[
+            {'Put': {'TableName': table_name, 'Item': dict(event, partition=DEAD_LETTER_PARTITION,
+                                                            pending_partition=event['partition'], last_error=error)}},
+            {'Delete': {'TableName': table_name, 'Key': {'partition': event['partition'], 'event_id': event['event_id']}}}
+        ]
+    )
+
+# helper function to record a failed attempt on an event, or dead-letter it once it is out of attempts
+def record_failure(event, error, sender_fault):
+    if sender_fault or int(event.get('attempts', 0)) + 1 >= RELAY_MAX_ATTEMPTS:
+        dead_letter(event, error)
+        return
+    table.update_item(
+        Key={'partition': event['partition'], 'event_id': event['event_id']},
+        UpdateExpression="SET last_error = :error ADD attempts :one",
+        ConditionExpression="attribute_exists(event_id)",
+        ExpressionAttributeValues={':error': error, ':one': 1}
+    )
+
+# where the next pass continues in each partition {partition: last evaluated key}, kept by the relay holding the lease
+# failed events are paged past instead of read again first, so they can never hold up the events behind them
+_resume_keys = {}
+
+# helper function to relay the events of one pending partition, returns the number of events relayed
+def relay_partition(partition):
+    relayed = 0
+    start_key = _resume_keys.pop(partition, None)
+    for _ in range(RELAY_BATCHES_PER_PARTITION):
+        query_kwargs = {'KeyConditionExpression': Key('partition').eq(partition), 'Limit': RELAY_BATCH_SIZE}
+        if start_key:
+            query_kwargs['ExclusiveStartKey'] = start_key
+        response = table.query(**query_kwargs)
+        events = response.get('Items', [])
+        if events:
+            sent, failures = relay_batch(events)
+            # sent events leave the outbox, failed ones stay pending until they are out of attempts
+            with table.batch_writer() as batch:
+                for event in sent:
+                    batch.delete_item(Key={'partition': partition, 'event_id': event['event_id']})
+            relayed += len(sent)
+            for event, error, sender_fault in failures:
+                try:
+                    record_failure(event, error, sender_fault)
+                except ClientError as e:
+                    logging.error("Error recording failed outbox event %s: %s", event['event_id'], e)
+        start_key = response.get('LastEvaluatedKey')
+        if not start_key:
+            return relayed
+    # out of batches for this pass, the next one carries on from here and wraps around at the end
+    _resume_keys[partition] = start_key
+    return relayed
+
+# function to move pending outbox events to their queues, returns the number of events relayed
+def relay_once(owner):
+    # sent events are deleted, so whatever a partition holds is still unsent - each pass carries on where
+    # the previous one stopped and starts over at the end, so every event is read again, however old
+    if not acquire_lease(owner):
+        _resume_keys.clear()  # another relay holds the lease, start over when it comes back to this one
+        return 0
+    return sum(relay_partition(partition) for partition in PENDING_PARTITIONS)
+
+# function to relay outbox events until the stop event is set
+def run_relay(stop_event, interval_seconds=1.0):
+    owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+    while not stop_event.is_set():
+        try:
+            relayed = relay_once(owner)
+        except Exception as e:
+            logging.error("Outbox relay failed: %s", e)
+            relayed = 0
+        # keep draining while there is a backlog, otherwise wait for new events
+        if not relayed:
+            stop_event.wait(interval_seconds)
+
+# function to start the relay in a background thread, returns the event that stops it
+def start_relay_thread(interval_seconds=1.0):
+    stop_event = threading.Event()
+    threading.Thread(target=run_relay, args=(stop_event, interval_seconds), name='outbox-relay', daemon=True).start()
+    return stop_event
@@ -0,0 +1,95 @@
+import base64
+import binascii
+import json
+
+# default and maximum number of items returned in one page
+DEFAULT_PAGE_SIZE = 25
+MAX_PAGE_SIZE = 100
+
+# response header carrying the cursor for the next page
+NEXT_CURSOR_HEADER = 'X-Next-Cursor'
+
+# function to turn a DynamoDB LastEvaluatedKey into an opaque, url safe cursor
+def encode_cursor(last_evaluated_key):
+    if not last_evaluated_key:
+        return None
+    raw = json.dumps(last_evaluated_key, separators=(',', ':'), sort_keys=True).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+# function to turn a cursor back into an ExclusiveStartKey, raises ValueError if it was tampered with
+def decode_cursor(cursor):
+    if not cursor:
+        return None
+    padded = cursor + '=' * (-len(cursor) % 4)
+    try:
+        start_key = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, binascii.Error):
+        raise ValueError("Invalid cursor.")
+    if not isinstance(start_key, dict):
+        raise ValueError("Invalid cursor.")
+    return start_key
+
+# function to validate the requested page size, None means "return everything"
+def parse_page_size(value, default=None):
+    if value is None or value == '':
+        return default
+    try:
+        page_size = int(value)
+    except (TypeError, ValueError):
+        raise ValueError("Page size must be a whole number.")
+    if page_size < 1:
+        raise ValueError("Page size must be at least 1.")
+    return min(page_size, MAX_PAGE_SIZE)
+
+# function to check that a decoded cursor is a key of the query it is used for, raises ValueError otherwise
+def validate_cursor(start_key, cursor_keys, owner):
+    '''
+        cursor_keys - every attribute of the query's LastEvaluatedKey (table key plus index key), all strings
+        owner - {attribute: value} the cursor must carry, e.g. {'user_id': user_id}, so a cursor never
+                starts a page in another user's partition
+        a cursor that fails these checks would reach DynamoDB as a ValidationException
+    '''
+    if set(start_key) != set(cursor_keys):
+        raise ValueError("Invalid cursor.")
+    if not all(isinstance(value, str) and value for value in start_key.values()):
+        raise ValueError("Invalid cursor.")
+    if any(start_key[name] != value for name, value in (owner or {}).items()):
+        raise ValueError("Invalid cursor.")
+
+# helper function to read the 'limit' and 'cursor' query parameters from a flask request
+def get_page_args(request, default_page_size=None, cursor_keys=None, owner=None):
+    page_size = parse_page_size(request.args.get('limit'), default_page_size)
+    start_key = decode_cursor(request.args.get('cursor'))
+    if start_key and cursor_keys:
+        validate_cursor(start_key, cursor_keys, owner)
+    return page_size, start_key
+
+# helper function to run a paginated table.query
+def query_page(table, page_size=None, start_key=None, **query_kwargs):
+    '''
+        page_size - maximum items to return, None drains every page so callers never lose items past 1 MB
+        start_key - ExclusiveStartKey decoded from the client cursor
+        returns (items, next_cursor) where next_cursor is None on the last page
+    '''
+    items = []
+    while True:
+        if start_key:
+            query_kwargs['ExclusiveStartKey'] = start_key
+        if page_size:
+            query_kwargs['Limit'] = page_size - len(items)
+        response = table.query(**query_kwargs)
+        items.extend(response.get('Items', []))
+        start_key = response.get('LastEvaluatedKey')
+        if not start_key:
+            return items, None
+        if page_size and len(items) >= page_size:
+            return items, encode_cursor(start_key)
+
+# helper function to iterate over every item of a table.query, one page in memory at a time
+def iter_query(table, **query_kwargs):
+    while True:
+        response = table.query(**query_kwargs)
+        yield from response.get('Items', [])
+        if 'LastEvaluatedKey' not in response:
+            return
+        query_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
@@ -0,0 +1,135 @@
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from components import resource_registry
+from components.resource_registry import set_handle, queue_url_handle, BUCKET_NAME
+from components.vehicle_table import create_vehicle_table
+from components.maintenance_table import create_maintenance_table
+from components.outbox import create_outbox_table
+from components.report_manifest import create_report_manifest_table
+from components.user_counters import create_user_counters_table
+from components.delete_jobs import create_delete_jobs_table
+from components.sqs_service import create_sqs_queue, get_sqs_queue_arn
+from components.s3_service import create_bucket, get_bucket_name
+from components.lambda_service import create_lambda_function, add_sqs_trigger_to_lambda
+from components.cognito_service import setup_cognito_resources
+from config import (MAINTENANCE_OUTBOX_ENABLED, QUEUE_NAME, REPORT_FUNCTION_NAME, LAMBDA_ROLE_ARN,
+                    STATE_MANIFEST_PATH, PROVISION_WORKERS)
+
+MANIFEST_VERSION = 1
+
+# function to read the state manifest, None if provisioning has not run yet
+def load_manifest(path=STATE_MANIFEST_PATH):
+    try:
+        with open(path) as manifest_file:
+            manifest = json.load(manifest_file)
+    except FileNotFoundError:
+        return None
+    except ValueError as e:
+        logging.error("Ignoring unreadable state manifest %s: %s", path, e)
+        return None
+    if manifest.get('version') != MANIFEST_VERSION:
+        logging.warning("Ignoring state manifest %s with version %s.", path, manifest.get('version'))
+        return None
+    return manifest
+
+# function to write the state manifest atomically
+def write_manifest(manifest, path=STATE_MANIFEST_PATH):
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'w') as manifest_file:
+        json.dump(manifest, manifest_file, indent=2, sort_keys=True)
+    os.replace(temp_path, path)
+
+# function to put the handles from the manifest into the resource registry, so the app starts without lookups
+def seed_registry(manifest):
+    for name, value in manifest.get('handles', {}).items():
+        set_handle(name, value)
+
+# helper function to treat the error strings returned by the create functions as failures
+def check_result(result):
+    if isinstance(result, str) and (result.startswith("Error") or result.startswith("An error")):
+        raise RuntimeError(result)
+    return result
+
+# provisioning steps
+def provision_queue():
+    queue_url = create_sqs_queue(QUEUE_NAME)
+    if queue_url is None:
+        raise RuntimeError(f"Unable to create or find queue '{QUEUE_NAME}'.")
+    set_handle(queue_url_handle(QUEUE_NAME), queue_url)
+    if get_sqs_queue_arn(QUEUE_NAME) is None:
+        raise RuntimeError(f"Unable to read the ARN of queue '{QUEUE_NAME}'.")
+    return queue_url
+
+def provision_bucket():
+    bucket_name = get_bucket_name()
+    set_handle(BUCKET_NAME, bucket_name)
+    return check_result(create_bucket(bucket_name))
+
+def provision_cognito(previous_handles):
+    user_pool_id, user_pool_client_id = setup_cognito_resources(
+        previous_handles.get(resource_registry.USER_POOL_ID),
+        previous_handles.get(resource_registry.USER_POOL_CLIENT_ID)
+    )
+    return f"User pool {user_pool_id}, client {user_pool_client_id}"
+
+# function to list the provisioning steps as {name: (dependencies, function)}
+def build_steps(previous_handles):
+    steps = {
+        'vehicles_table': ((), lambda: check_result(create_vehicle_table())),
+        'maintenance_table': ((), lambda: check_result(create_maintenance_table())),
+        'report_manifest_table': ((), lambda: check_result(create_report_manifest_table())),
+        'user_counters_table': ((), lambda: check_result(create_user_counters_table())),
+        'delete_jobs_table': ((), lambda: check_result(create_delete_jobs_table())),
+        'sqs_queue': ((), provision_queue),
+        's3_bucket': ((), provision_bucket),
+        'cognito': ((), lambda: provision_cognito(previous_handles)),
+        'lambda_function': (('s3_bucket',), lambda: check_result(create_lambda_function(REPORT_FUNCTION_NAME, LAMBDA_ROLE_ARN))),
+        'sqs_trigger': (('lambda_function', 'sqs_queue'), lambda: check_result(add_sqs_trigger_to_lambda(REPORT_FUNCTION_NAME)))
+    }
+    if MAINTENANCE_OUTBOX_ENABLED:
+        steps['outbox_table'] = ((), lambda: check_result(create_outbox_table()))
+    return steps
+
+# helper function to run one step and time it
+def run_step(function):
+    start = time.perf_counter()
+    try:
+        return {'status': 'ok', 'result': str(function()), 'seconds': time.perf_counter() - start}
+    except Exception as e:
+        return {'status': 'failed', 'result': str(e), 'seconds': time.perf_counter() - start}
+
+# function to run steps concurrently, each one as soon as its dependencies succeeded
+def run_steps(steps, max_workers=PROVISION_WORKERS):
+    results = {}
+    running = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while len(results) < len(steps):
+            for name, (dependencies, function) in steps.items():
+                if name in results or name in running.values():
+                    continue
+                if any(results.get(dependency, {}).get('status') in ('failed', 'skipped') for dependency in dependencies):
+                    results[name] = {'status': 'skipped', 'result': "a dependency failed", 'seconds': 0.0}
+                elif all(dependency in results for dependency in dependencies):
+                    running[executor.submit(run_step, function)] = name
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                results[running.pop(future)] = future.result()
+    return results
+
+# function to provision every resource and write the state manifest, returns (manifest, step results)
+def provision(manifest_path=STATE_MANIFEST_PATH, max_workers=PROVISION_WORKERS):
+    previous = load_manifest(manifest_path) or {}
+    results = run_steps(build_steps(previous.get('handles', {})), max_workers)
+    manifest = {
+        'version': MANIFEST_VERSION,
+        'generated_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'handles': resource_registry.get_cached_handles(),
+        'steps': {name: result['status'] for name, result in results.items()}
+    }
+    write_manifest(manifest, manifest_path)
+    return manifest, results
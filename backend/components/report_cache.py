@@ -0,0 +1,59 @@
+import threading
+import time
+from collections import OrderedDict
+
+# cached reports - {object key: (etag, parsed report, size in bytes, validated_at)}, least recently used first
+_entries = OrderedDict()
+_total_bytes = 0
+_lock = threading.Lock()
+
+# function to read a cached report, returns (etag, report, validated_at) or None
+def get(key):
+    with _lock:
+        entry = _entries.get(key)
+        if entry is None:
+            return None
+        _entries.move_to_end(key)  # mark as most recently used
+        etag, report, size, validated_at = entry
+        return etag, report, validated_at
+
+# function to peek at the etag of a cached report without touching its position
+def get_etag(key):
+    with _lock:
+        entry = _entries.get(key)
+        return entry[0] if entry else None
+
+# function to cache a report, evicting least recently used reports until the cache fits in max_bytes
+def put(key, etag, report, size, max_bytes):
+    global _total_bytes
+    with _lock:
+        previous = _entries.pop(key, None)
+        if previous:
+            _total_bytes -= previous[2]
+        if size > max_bytes:
+            return  # never let one report flush the whole cache
+        _entries[key] = (etag, report, size, time.monotonic())
+        _total_bytes += size
+        while _total_bytes > max_bytes:
+            _, evicted = _entries.popitem(last=False)
+            _total_bytes -= evicted[2]
+
+# function to drop a report from the cache, e.g. after it was deleted
+def discard(key):
+    global _total_bytes
+    with _lock:
+        entry = _entries.pop(key, None)
+        if entry:
+            _total_bytes -= entry[2]
+
+# function to mark a cached report as confirmed unchanged by S3
+def touch(key):
+    with _lock:
+        entry = _entries.get(key)
+        if entry:
+            _entries[key] = entry[:3] + (time.monotonic(),)
+
+# function to read the cache counters
+def get_stats():
+    with _lock:
+        return {'entries': len(_entries), 'bytes': _total_bytes}
@@ -0,0 +1,94 @@
+import logging
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime
+from components.s3_service import read_report_object
+from config import REPORT_EXPORT_WORKERS
+
+# reports being fetched per export, bounds the memory of one export to this many report bodies
+MAX_IN_FLIGHT = REPORT_EXPORT_WORKERS * 2
+# name of the archive member listing the reports that could not be fetched
+ERRORS_FILE_NAME = 'export_errors.txt'
+
+# thread pool shared by every export of the process, created on first use
+_executor = None
+_executor_lock = threading.Lock()
+
+# helper function to get the shared thread pool
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=REPORT_EXPORT_WORKERS, thread_name_prefix='report-export')
+    return _executor
+
+# write-only file object collecting what zipfile writes until the generator hands it to the response
+class _ZipBuffer:
+    def __init__(self):
+        self.parts = []
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.parts)
+        self.parts = []
+        return data
+
+# helper function to get the zip timestamp of a report from its id, report ids start with YYYYMMDDHHMMSS
+def _member_time(entry):
+    try:
+        return datetime.strptime(entry['report_id'][:14], '%Y%m%d%H%M%S').timetuple()[:6]
+    except (KeyError, ValueError):
+        return datetime.now().timetuple()[:6]
+
+# function to stream a zip archive of the given manifest entries
+def stream_reports_zip(entries, bucket_name=None):
+    '''
+        entries - iterable of manifest entries, read lazily so the listing is paged while the archive is written
+        reports are fetched concurrently (at most MAX_IN_FLIGHT at a time) and added in the order they arrive
+        the archive is written without seeking, zipfile then stores sizes and crc in data descriptors
+        yields bytes; reports that cannot be fetched are listed in export_errors.txt at the end of the archive
+    '''
+    buffer = _ZipBuffer()
+    executor = _get_executor()
+    entries = iter(entries)
+    pending = {}
+    errors = []
+    try:
+        with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+            while True:
+                # keep the pool busy without reading more of the listing than needed
+                for entry in entries:
+                    future = executor.submit(read_report_object, entry['object_key'], bucket_name)
+                    pending[future] = entry
+                    if len(pending) >= MAX_IN_FLIGHT:
+                        break
+                if not pending:
+                    break
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    entry = pending.pop(future)
+                    try:
+                        data = future.result()
+                    except Exception as e:
+                        logging.error("Error exporting report %s: %s", entry['object_key'], e)
+                        errors.append(f"{entry['object_key']}: {e}")
+                        continue
+                    member = zipfile.ZipInfo(entry['object_key'].rpartition('/')[2], _member_time(entry))
+                    member.compress_type = zipfile.ZIP_DEFLATED
+                    archive.writestr(member, data)
+                    yield buffer.drain()
+            if errors:
+                archive.writestr(ERRORS_FILE_NAME, '\n'.join(errors) + '\n')
+        yield buffer.drain()  # the central directory, written when the archive is closed
+    finally:
+        # the client went away (or a write failed), stop fetching reports nobody will receive
+        for future in pending:
+            future.cancel()
@@ -0,0 +1,207 @@
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from maintenance_utils.report_generation import generate_report
+from components.report_keys import make_report_id, report_object_name, manifest_entry, history_id, history_object_name, history_entry
+
+# number of records of one batch processed at the same time
+REPORT_WORKERS = int(os.environ.get('REPORT_WORKERS', '8'))
+# bucket the reports are written to, set on the function by lambda_service.create_lambda_function
+REPORT_BUCKET = os.environ.get('REPORT_BUCKET', 'vehicle-maintenance-reports-folder')
+# table every report is recorded in, so the API lists reports with a query instead of an S3 listing
+REPORT_MANIFEST_TABLE = os.environ.get('REPORT_MANIFEST_TABLE', 'ReportManifest')
+# '' - one object per report, 'vehicle' / 'month' - append reports to one history per vehicle / per user and month
+REPORT_AGGREGATION = os.environ.get('REPORT_AGGREGATION', '')
+# read-modify-write attempts on a history before its records are handed back to SQS
+HISTORY_WRITE_ATTEMPTS = 5
+
+# clients and thread pool are created on first use and then reused across warm invocations
+clients = {}
+executor = None
+_init_lock = threading.Lock()
+
+# function to get a shared boto3 client, boto3 is only imported when the first record needs it
+def get_client(service_name):
+    client = clients.get(service_name)
+    if client is None:
+        with _init_lock:
+            client = clients.get(service_name)
+            if client is None:
+                import boto3
+                client = clients[service_name] = boto3.client(service_name)
+    return client
+
+# helper function to convert a manifest entry to the typed attribute format of the low level client
+def to_attributes(entry):
+    return {key: {'N': str(value)} if isinstance(value, int) else {'S': str(value)} for key, value in entry.items()}
+
+# function to get the shared thread pool used to process the records of a batch
+def get_executor():
+    global executor
+    if executor is None:
+        with _init_lock:
+            if executor is None:
+                executor = ThreadPoolExecutor(max_workers=REPORT_WORKERS)
+    return executor
+
+# function to build the id of a report
+def get_report_id(record):
+    # SentTimestamp and messageId make the id unique per message and stable across retries of that message
+    sent_millis = int(record.get('attributes', {}).get('SentTimestamp', 0)) or int(datetime.now(timezone.utc).timestamp() * 1000)
+    timestamp = datetime.fromtimestamp(sent_millis / 1000, timezone.utc).strftime('%Y%m%d%H%M%S')
+    return make_report_id(timestamp, record['messageId'][:8])
+
+# helper function to read the message of a record and generate its report
+def build_report(record):
+    message_body = json.loads(record['body'])
+    report = generate_report(
+        {'make': message_body['make'], 'model': message_body['model'], 'year': message_body['year']},
+        {
+            'maintenance_type': message_body['maintenance_type'],
+            'mileage': message_body['mileage'],
+            'last_service_date': message_body['last_service_date'],
+            'next_service_date': message_body['next_service_date']
+        }
+    )
+    return message_body, get_report_id(record), report
+
+# function to turn one SQS record into a report object in S3, raises on any failure
+def process_record(record, bucket_name):
+    message_body, report_id, report = build_report(record)
+    user_id = message_body['user_id']  # Extract user ID from the message body
+    object_name = report_object_name(user_id, report_id)
+    body = json.dumps(report).encode('utf-8')
+    # vehicle and maintenance type are kept as object metadata too, so the manifest can be rebuilt from the bucket
+    get_client('s3').put_object(
+        Bucket=bucket_name,
+        Key=object_name,
+        Body=body,
+        Metadata={'vehicle-id': message_body['vehicle_id'], 'maintenance-type': message_body['maintenance_type']}
+    )
+    entry = manifest_entry(user_id, report_id, message_body['vehicle_id'], message_body['maintenance_type'], object_name, len(body))
+    get_client('dynamodb').put_item(TableName=REPORT_MANIFEST_TABLE, Item=to_attributes(entry))
+    return object_name
+
+# helper function to get the history a report is appended to
+def get_history_id(message_body, report_id):
+    if REPORT_AGGREGATION == 'vehicle':
+        return history_id('vehicle', message_body['vehicle_id'])
+    return history_id('month', report_id[:6])  # report ids start with YYYYMM
+
+# helper function to get the code of a botocore ClientError, boto3 is not imported at module level
+def error_code(error):
+    return getattr(error, 'response', {}).get('Error', {}).get('Code')
+
+# function to append the reports of one batch to a history with a single read-modify-write
+def append_to_history(user_id, hid, vehicle_id, entries, bucket_name):
+    '''
+        the manifest entry of a history holds its version and current object
+        a new version is written to a new key, then the entry is moved to it only if nobody else did so first
+        (put_item with a condition on the version read); on a lost race the new object is deleted and the
+        append is retried on top of the winner, so concurrent consumers never lose each other's reports
+    '''
+    s3 = get_client('s3')
+    dynamodb = get_client('dynamodb')
+    key = {'user_id': {'S': user_id}, 'report_id': {'S': hid}}
+    for attempt in range(HISTORY_WRITE_ATTEMPTS):
+        head = dynamodb.get_item(TableName=REPORT_MANIFEST_TABLE, Key=key, ConsistentRead=True).get('Item')
+        if head:
+            version = int(head['version']['N'])
+            history = json.loads(s3.get_object(Bucket=bucket_name, Key=head['object_key']['S'])['Body'].read())
+        else:
+            version = 0
+            history = {'user_id': user_id, 'history_id': hid, 'entries': []}
+
+        # SQS may deliver a message twice, a report already in the history is not added again
+        known = {entry['report_id'] for entry in history['entries']}
+        new_entries = [entry for entry in entries if entry['report_id'] not in known]
+        if not new_entries:
+            return head['object_key']['S']
+        history['entries'].extend(new_entries)
+        history['entries'].sort(key=lambda entry: entry['report_id'])
+
+        body = json.dumps(history, separators=(',', ':')).encode('utf-8')
+        object_name = history_object_name(user_id, hid, version + 1, uuid.uuid4().hex[:8])
+        s3.put_object(Bucket=bucket_name, Key=object_name, Body=body)
+        entry = history_entry(user_id, hid, vehicle_id, object_name, version + 1, len(history['entries']), len(body),
+                              history['entries'][-1]['created_at'])
+        try:
+            dynamodb.put_item(
+                TableName=REPORT_MANIFEST_TABLE,
+                Item=to_attributes(entry),
+                ConditionExpression='attribute_not_exists(report_id) OR version = :version',
+                ExpressionAttributeValues={':version': {'N': str(version)}}
+            )
+        except Exception as e:
+            s3.delete_object(Bucket=bucket_name, Key=object_name)
+            if error_code(e) != 'ConditionalCheckFailedException':
+                raise
+            time.sleep(random.uniform(0, 0.05 * 2 ** attempt))  # another consumer appended first, retry on its version
+            continue
+        if head:
+            s3.delete_object(Bucket=bucket_name, Key=head['object_key']['S'])  # readers retry once if they raced this
+        return object_name
+    raise RuntimeError(f"History {hid} of user {user_id} kept changing, giving up after {HISTORY_WRITE_ATTEMPTS} attempts.")
+
+# function to process a batch in aggregation mode, returns the ids of the messages that failed
+def aggregate_records(records, bucket_name):
+    failed = []
+    groups = {}
+    for record in records:
+        try:
+            message_body, report_id, report = build_report(record)
+        except Exception as e:
+            print(f"Failed to process message {record.get('messageId')}: {e}")
+            failed.append(record['messageId'])
+            continue
+        group_key = (message_body['user_id'], get_history_id(message_body, report_id))
+        group = groups.setdefault(group_key, {'vehicle_id': None, 'entries': [], 'message_ids': []})
+        if REPORT_AGGREGATION == 'vehicle':
+            group['vehicle_id'] = message_body['vehicle_id']
+        group['entries'].append({
+            'report_id': report_id,
+            'created_at': report_id.split('_')[0],
+            'vehicle_id': message_body['vehicle_id'],
+            'maintenance_type': message_body['maintenance_type'],
+            'report': report
+        })
+        group['message_ids'].append(record['messageId'])
+
+    # one read-modify-write per history for the whole batch, histories are written concurrently
+    futures = [(group, get_executor().submit(append_to_history, user_id, hid, group['vehicle_id'], group['entries'], bucket_name))
+               for (user_id, hid), group in groups.items()]
+    for group, future in futures:
+        try:
+            future.result()
+        except Exception as e:
+            print(f"Failed to append {len(group['message_ids'])} reports to history: {e}")
+            failed.extend(group['message_ids'])
+    return failed
+
+# lambda entry point - processes the batch concurrently and reports only the failed messages for retry
+def lambda_handler(event, context):
+    records = event.get('Records', [])
+    # create the clients once, before the worker threads need them
+    get_client('s3')
+    get_client('dynamodb')
+
+    batch_item_failures = []
+    if REPORT_AGGREGATION:
+        batch_item_failures = [{'itemIdentifier': message_id} for message_id in aggregate_records(records, REPORT_BUCKET)]
+    else:
+        futures = [(record, get_executor().submit(process_record, record, REPORT_BUCKET)) for record in records]
+        for record, future in futures:
+            try:
+                future.result()
+            except Exception as e:
+                print(f"Failed to process message {record.get('messageId')}: {e}")
+                batch_item_failures.append({'itemIdentifier': record['messageId']})
+
+    print(f"Processed {len(records) - len(batch_item_failures)} of {len(records)} records.")
+    # requires FunctionResponseTypes=['ReportBatchItemFailures'] on the event source mapping
+    return {'batchItemFailures': batch_item_failures}
@@ -0,0 +1,141 @@
+import threading
+from collections import OrderedDict
+from itertools import islice
+from html import escape as escape_html
+
+# rendered html is handed to the response after every this many top level report fields
+FIELDS_PER_CHUNK = 256
+
+DOCUMENT_START = '<!DOCTYPE html><html><head><meta charset="utf-8"><title>Maintenance reports</title></head><body>'
+DOCUMENT_END = '</body></html>'
+
+# values only ever land in element content, where quotes need no escaping
+# most contain no markup characters at all and skip the replace calls of html.escape
+def has_markup(text):
+    return '&' in text or '<' in text or '>' in text
+
+# helper function to escape a value for html element content
+def escape(text):
+    return escape_html(text, quote=False) if has_markup(text) else text
+
+# rendered report sections - {(etag, title): html}, least recently used first, bounded by total characters
+_sections = OrderedDict()
+_total_chars = 0
+_lock = threading.Lock()
+
+# values rendered as nested lists
+NESTED_TYPES = (dict, list)
+
+# helper function to render one value, nested dicts become nested lists and lists become ordered lists
+def _render_value(value, parts):
+    if isinstance(value, dict):
+        parts.append('<ul>')
+        for key, item in value.items():
+            parts.append(f'<li><strong>{escape(str(key))}:</strong> ')
+            _render_value(item, parts)
+            parts.append('</li>')
+        parts.append('</ul>')
+    elif isinstance(value, list):
+        parts.append('<ol>')
+        for item in value:
+            parts.append('<li>')
+            _render_value(item, parts)
+            parts.append('</li>')
+        parts.append('</ol>')
+    else:
+        parts.append(escape(str(value)))
+
+# helper function to render one value to a string
+def render_value(value):
+    parts = []
+    _render_value(value, parts)
+    return ''.join(parts)
+
+# helper function to escape many strings at once - one join, one search and one split instead of a search per string
+def escape_all(texts):
+    joined = '\0'.join(texts)
+    if not has_markup(joined):
+        return texts
+    escaped = escape_html(joined, quote=False).split('\0')
+    # a string holding the separator itself would shift every later string, escape those one by one instead
+    return escaped if len(escaped) == len(texts) else [escape(text) for text in texts]
+
+# function to render one report as an html section, yields a piece every FIELDS_PER_CHUNK top level fields
+def render_section(title, report):
+    parts = [f'<section><h1>{escape(title)}</h1>']
+    if isinstance(report, dict):
+        # top level fields are rendered a chunk at a time so a large report is yielded while it is being rendered
+        parts.append('<ul>')
+        fields = iter(report.items())
+        while True:
+            chunk = list(islice(fields, FIELDS_PER_CHUNK))
+            if not chunk:
+                break
+            names = escape_all([str(key) for key, value in chunk])
+            texts = escape_all([value if type(value) is str else '' if isinstance(value, NESTED_TYPES) else str(value)
+                                for key, value in chunk])
+            # nested values are rarer and rendered (and escaped) on their own
+            for index, (key, value) in enumerate(chunk):
+                if isinstance(value, NESTED_TYPES):
+                    texts[index] = render_value(value)
+            parts.extend([f'<li><strong>{name}:</strong> {text}</li>' for name, text in zip(names, texts)])
+            yield ''.join(parts)
+            parts = []
+        parts.append('</ul>')
+    else:
+        _render_value(report, parts)
+    parts.append('</section>')
+    yield ''.join(parts)
+
+# helper function to read a rendered section from the cache
+def _get_cached(key):
+    with _lock:
+        html = _sections.get(key)
+        if html is not None:
+            _sections.move_to_end(key)
+        return html
+
+# helper function to cache a rendered section, evicting least recently used sections until the cache fits
+def _put_cached(key, html, max_chars):
+    global _total_chars
+    if len(html) > max_chars:
+        return
+    with _lock:
+        previous = _sections.pop(key, None)
+        if previous is not None:
+            _total_chars -= len(previous)
+        _sections[key] = html
+        _total_chars += len(html)
+        while _total_chars > max_chars:
+            _, evicted = _sections.popitem(last=False)
+            _total_chars -= len(evicted)
+
+# function to render a report section, reusing the html rendered earlier for the same report ETag
+def render_cached_section(etag, title, report, max_chars):
+    if etag is None:
+        yield from render_section(title, report)  # nothing to key the cache on
+        return
+    key = (etag, title)
+    html = _get_cached(key)
+    if html is not None:
+        yield html
+        return
+    chunks = []
+    for chunk in render_section(title, report):
+        chunks.append(chunk)
+        yield chunk
+    # only cached once the whole section was rendered, a client that disconnects leaves nothing half done
+    _put_cached(key, ''.join(chunks), max_chars)
+
+# function to render a whole html document from (etag, title, report) sections
+# reports may be any iterable, each one is only fetched when the document reaches it
+def render_document(sections, max_chars):
+    yield DOCUMENT_START
+    for etag, title, report in sections:
+        yield from render_cached_section(etag, title, report, max_chars)
+    yield DOCUMENT_END
+
+# function to read the cache counters
+def get_stats():
+    with _lock:
+        return {'entries': len(_sections), 'chars': _total_chars}
@@ -0,0 +1,105 @@
+# S3 key layout of maintenance reports, shared by the report lambda and the API
+# reports/{user_id}/{user_id}_maintenance_report_{report id}.json, report id = {timestamp}_{message id}
+
+REPORTS_PREFIX = 'reports/'
+REPORT_NAME_MARKER = '_maintenance_report_'
+
+# function to get the prefix holding every report of a user
+def user_reports_prefix(user_id):
+    return f"{REPORTS_PREFIX}{user_id}/"
+
+# function to build the id of a report, it sorts by creation time
+def make_report_id(timestamp, suffix):
+    return f"{timestamp}_{suffix}"
+
+# function to build the key of a new report
+def report_object_name(user_id, report_id):
+    return f"{user_reports_prefix(user_id)}{user_id}{REPORT_NAME_MARKER}{report_id}.json"
+
+# function to read the report id back from a key, None if the key is not a report key
+def report_id_from_key(key):
+    report_name = key.rpartition('/')[2]
+    _, marker, report_id = report_name.rpartition(REPORT_NAME_MARKER)
+    if not marker or not report_id.endswith('.json'):
+        return None
+    return report_id[:-len('.json')]
+
+# function to get the user id a report file name belongs to, None if the name is not a report name
+def report_owner(report_name):
+    user_id, marker, _ = report_name.rpartition(REPORT_NAME_MARKER)
+    return user_id if marker and user_id else None
+
+# function to turn the name the frontend sends (a key below reports/ or a bare file name) into the object key
+def report_key_from_name(report_name):
+    if '/' in report_name:
+        return REPORTS_PREFIX + report_name
+    user_id = report_owner(report_name)
+    if user_id is None:
+        return REPORTS_PREFIX + report_name
+    return user_reports_prefix(user_id) + report_name
+
+# function to check whether a report key belongs to a user, in the per-user or the old flat layout
+def is_user_report_key(user_id, key):
+    report_name = key.rpartition('/')[2]
+    if report_owner(report_name) != user_id:
+        return False
+    return key in (user_reports_prefix(user_id) + report_name, REPORTS_PREFIX + report_name)
+
+# function to map a key of the old flat layout (reports/{name}) to the per-user layout, None if it is not one
+def migrated_report_key(key):
+    if not key.startswith(REPORTS_PREFIX):
+        return None
+    report_name = key[len(REPORTS_PREFIX):]
+    if '/' in report_name:
+        return None  # already in a user folder
+    user_id = report_owner(report_name)
+    if user_id is None:
+        return None
+    return user_reports_prefix(user_id) + report_name
+
+# function to build the ReportManifest entry of a report, used by the report lambda and the reconciliation job
+def manifest_entry(user_id, report_id, vehicle_id, maintenance_type, object_key, size):
+    return {
+        'user_id': user_id,
+        'report_id': report_id,  # sort key - newest first when queried in descending order
+        'user_vehicle': f"{user_id}#{vehicle_id}",  # partition key of the per-vehicle index
+        'created_at': report_id.split('_')[0],
+        'vehicle_id': vehicle_id,
+        'maintenance_type': maintenance_type,
+        'object_key': object_key,
+        'size': size
+    }
+
+# aggregated histories - one object per vehicle or per user and month instead of one object per report
+# their manifest entry (report_id history#{scope}#{value}) points at the current object and carries its version
+HISTORY_ID_PREFIX = 'history#'
+HISTORY_SCOPES = ('vehicle', 'month')
+
+# function to build the manifest id of a history, scope is 'vehicle' (value vehicle id) or 'month' (value YYYYMM)
+def history_id(scope, value):
+    return f"{HISTORY_ID_PREFIX}{scope}#{value}"
+
+# function to check whether a manifest id belongs to a history rather than a single report
+def is_history_id(report_id):
+    return report_id.startswith(HISTORY_ID_PREFIX)
+
+# function to build the key of one version of a history, every write goes to a new key so a lost race never overwrites
+def history_object_name(user_id, history_id, version, suffix):
+    scope_value = history_id[len(HISTORY_ID_PREFIX):].replace('#', '_')
+    return f"{user_reports_prefix(user_id)}history/{scope_value}_{version:08d}_{suffix}.json"
+
+# function to build the ReportManifest entry of a history version
+def history_entry(user_id, history_id, vehicle_id, object_key, version, entry_count, size, updated_at):
+    entry = {
+        'user_id': user_id,
+        'report_id': history_id,
+        'created_at': updated_at,
+        'object_key': object_key,
+        'version': version,  # compared by the conditional write of the next version
+        'entries': entry_count,
+        'size': size
+    }
+    if vehicle_id:
+        entry['user_vehicle'] = f"{user_id}#{vehicle_id}"  # vehicle histories show up in the per-vehicle index
+        entry['vehicle_id'] = vehicle_id
+    return entry
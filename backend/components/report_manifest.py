@@ -0,0 +1,108 @@
+from components.aws_clients import get_resource
+from botocore.exceptions import ClientError
+from boto3.dynamodb.conditions import Key
+from components.pagination import query_page
+from components.table_setup import ensure_table
+from components.report_keys import HISTORY_ID_PREFIX
+
+# initialize DynamoDB client
+dynamodb = get_resource('dynamodb')
+
+# define table name, also passed to the report lambda as REPORT_MANIFEST_TABLE
+table_name = 'ReportManifest'
+
+# index used to list the reports of one of the user's vehicles, keyed on "{user_id}#{vehicle_id}"
+VEHICLE_INDEX_NAME = 'user_vehicle-index'
+
+# attributes of a LastEvaluatedKey from the table and from the vehicle index (table key plus index key)
+CURSOR_KEYS = ('user_id', 'report_id')
+VEHICLE_CURSOR_KEYS = ('user_id', 'report_id', 'user_vehicle')
+
+# create the ReportManifest table in DynamoDB, invoked from scripts.provision
+def create_report_manifest_table():
+    try:
+        # create the table if describe_table does not find it
+        '''
+            using client.create_table with parameters
+            TableName - name of the table
+            KeySchema - user_id partition key, report_id sort key (timestamp first, so it sorts by creation time)
+            AttributeDefinitions - describe the key schema for the table and the index
+            GlobalSecondaryIndexes - user_vehicle index for listing the reports of a single vehicle
+        '''
+        return ensure_table(
+            dynamodb.meta.client,
+            TableName=table_name,
+            KeySchema=[
+                {'AttributeName': 'user_id', 'KeyType': 'HASH'},
+                {'AttributeName': 'report_id', 'KeyType': 'RANGE'}
+            ],
+            AttributeDefinitions=[
+                {'AttributeName': 'user_id', 'AttributeType': 'S'},
+                {'AttributeName': 'report_id', 'AttributeType': 'S'},
+                {'AttributeName': 'user_vehicle', 'AttributeType': 'S'}
+            ],
+            GlobalSecondaryIndexes=[{
+                'IndexName': VEHICLE_INDEX_NAME,
+                'KeySchema': [
+                    {'AttributeName': 'user_vehicle', 'KeyType': 'HASH'},
+                    {'AttributeName': 'report_id', 'KeyType': 'RANGE'}
+                ],
+                'Projection': {'ProjectionType': 'ALL'}
+            }]
+        )
+    except ClientError as e:
+        return f"Error creating table: {e.response['Error']['Message']}"
+    except Exception as e:
+        return f"An error occurred: {str(e)}"
+
+# initialize the table
+table = dynamodb.Table(table_name)
+
+# report ids start with their timestamp, so every single report sorts below the history entries (history#...)
+# and an upper bound on report_id keeps histories out of report listings and exports
+
+# function to query a user's report entries newest first, optionally for one vehicle only
+def query_user_reports(user_id, page_size=None, start_key=None, vehicle_id=None):
+    if vehicle_id:
+        return query_page(
+            table,
+            page_size=page_size,
+            start_key=start_key,
+            IndexName=VEHICLE_INDEX_NAME,
+            KeyConditionExpression=Key('user_vehicle').eq(f"{user_id}#{vehicle_id}") & Key('report_id').lt(HISTORY_ID_PREFIX),
+            ScanIndexForward=False
+        )
+    return query_page(
+        table,
+        page_size=page_size,
+        start_key=start_key,
+        KeyConditionExpression=Key('user_id').eq(user_id) & Key('report_id').lt(HISTORY_ID_PREFIX),
+        ScanIndexForward=False
+    )
+
+# function to iterate over every report entry of a user oldest first, one page in memory at a time
+# from_id / to_id - optional inclusive report id bounds, report ids start with their timestamp so these select a date range
+def iter_user_reports(user_id, vehicle_id=None, from_id=None, to_id=None):
+    if vehicle_id:
+        key_condition = Key('user_vehicle').eq(f"{user_id}#{vehicle_id}")
+        query_kwargs = {'IndexName': VEHICLE_INDEX_NAME}
+    else:
+        key_condition = Key('user_id').eq(user_id)
+        query_kwargs = {}
+    # no history id equals the bare prefix, so the inclusive bound never lets a history through
+    to_id = min(to_id, HISTORY_ID_PREFIX) if to_id else HISTORY_ID_PREFIX
+    if from_id:
+        key_condition &= Key('report_id').between(from_id, to_id)
+    else:
+        key_condition &= Key('report_id').lte(to_id)
+    query_kwargs['KeyConditionExpression'] = key_condition
+    while True:
+        response = table.query(**query_kwargs)
+        yield from response.get('Items', [])
+        if 'LastEvaluatedKey' not in response:
+            return
+        query_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+# function to read one manifest entry, None if there is none
+def get_manifest_entry(user_id, report_id):
+    return table.get_item(Key={'user_id': user_id, 'report_id': report_id}).get('Item')
@@ -0,0 +1,88 @@
+import logging
+import threading
+from botocore.exceptions import ClientError
+
+# names of the handles kept in the registry
+USER_POOL_ID = 'user_pool_id'
+USER_POOL_CLIENT_ID = 'user_pool_client_id'
+BUCKET_NAME = 'bucket_name'
+
+# error codes AWS uses to say a resource does not exist (any more)
+MISSING_RESOURCE_CODES = {
+    'AWS.SimpleQueueService.NonExistentQueue',
+    'QueueDoesNotExist',
+    'ResourceNotFoundException',
+    'NoSuchBucket',
+    'NotFound',
+    '404'
+}
+
+# process-wide cache of resolved handles {name: value}
+_handles = {}
+_lock = threading.RLock()
+
+# function to build the handle name of a queue url
+def queue_url_handle(queue_name):
+    return f'queue_url:{queue_name}'
+
+# function to build the handle name of a queue arn
+def queue_arn_handle(queue_name):
+    return f'queue_arn:{queue_name}'
+
+# function to return a cached handle, resolving it once with the given function when it is not cached yet
+def get_handle(name, resolver):
+    value = _handles.get(name)
+    if value is not None:
+        return value
+    with _lock:
+        # another thread may have resolved it while we waited for the lock
+        value = _handles.get(name)
+        if value is None:
+            value = resolver()
+            if value is not None:  # never cache a failed lookup
+                _handles[name] = value
+        return value
+
+# function to store a handle that is already known, e.g. right after creating the resource
+def set_handle(name, value):
+    with _lock:
+        if value is not None:
+            _handles[name] = value
+
+# function to copy every cached handle, used to write the state manifest
+def get_cached_handles():
+    with _lock:
+        return dict(_handles)
+
+# function to drop cached handles so the next get_handle resolves them again
+def invalidate(*names):
+    with _lock:
+        for name in names:
+            _handles.pop(name, None)
+
+# function to check whether an error means the resource behind a handle is missing
+def is_missing_resource_error(error):
+    return isinstance(error, ClientError) and error.response.get('Error', {}).get('Code') in MISSING_RESOURCE_CODES
+
+# function to invalidate handles only when AWS reports that the resource is missing
+def invalidate_if_missing(error, *names):
+    if is_missing_resource_error(error):
+        logging.warning("Resource behind %s is missing, dropping cached handle.", ", ".join(names))
+        invalidate(*names)
+        return True
+    return False
+
+# function to call an operation with a cached handle, re-resolving and retrying once if the resource went missing
+def call_with_handle(name, resolver, operation):
+    handle = get_handle(name, resolver)
+    if handle is None:
+        raise LookupError(f"Unable to resolve {name}.")
+    try:
+        return operation(handle)
+    except ClientError as e:
+        if not invalidate_if_missing(e, name):
+            raise
+    handle = get_handle(name, resolver)
+    if handle is None:
+        raise LookupError(f"Unable to resolve {name}.")
+    return operation(handle)
@@ -1,9 +1,15 @@
-import boto3
+from components.aws_clients import get_client
 import json
+import time
 from botocore.exceptions import ClientError
+from components import report_cache
+from components.report_html import render_document
+from config import REPORT_CACHE_MAX_BYTES, REPORT_CACHE_REVALIDATE_SECONDS, REPORT_HTML_CACHE_MAX_CHARS
+from components.resource_registry import get_handle, invalidate_if_missing, BUCKET_NAME as BUCKET_HANDLE
+from components.report_manifest import query_user_reports, get_manifest_entry
 
 # initialize the s3 client
-s3_client = boto3.client('s3')
+s3_client = get_client('s3')
 
 # define a static bucket name
 BUCKET_NAME = "vehicle-maintenance-reports-folder"  
@@ -49,58 +55,162 @@ def upload_to_bucket(object_name, file_content, bucket_name=BUCKET_NAME):
         s3_client.put_object(Bucket=bucket_name, Key=object_name, Body=file_content)
         return f"File uploaded to '{bucket_name}/{object_name}' successfully."
     except ClientError as e:
+        invalidate_if_missing(e, BUCKET_HANDLE)
         return f"Error uploading file: {e.response['Error']['Message']}"
 
-# function to get bucket name
+# delete_objects takes at most 1000 keys per call
+DELETE_BATCH_SIZE = 1000
+
+# function to list every object key below a prefix
+def iter_object_keys(prefix, bucket_name=None):
+    paginator = s3_client.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=bucket_name or get_bucket_name(), Prefix=prefix):
+        for item in page.get('Contents', []):
+            yield item['Key']
+
+# function to delete report objects in batches, returns (deleted count, [(key, error message)])
+def delete_report_objects(keys, bucket_name=None):
+    '''
+        using client.delete_objects with parameters
+        Delete - up to 1000 keys per call, Quiet so only the failures come back
+    '''
+    bucket_name = bucket_name or get_bucket_name()
+    keys = list(keys)
+    deleted, errors = 0, []
+    for offset in range(0, len(keys), DELETE_BATCH_SIZE):
+        batch = keys[offset:offset + DELETE_BATCH_SIZE]
+        response = s3_client.delete_objects(
+            Bucket=bucket_name,
+            Delete={'Objects': [{'Key': key} for key in batch], 'Quiet': True}
+        )
+        failed = [(error['Key'], error.get('Message', error.get('Code'))) for error in response.get('Errors', [])]
+        errors.extend(failed)
+        deleted += len(batch) - len(failed)
+        for key in batch:
+            report_cache.discard(key)
+    return deleted, errors
+
+# function to get bucket name, cached in the resource registry
 def get_bucket_name():
-    return BUCKET_NAME  
+    return get_handle(BUCKET_HANDLE, lambda: BUCKET_NAME)
+
+# function to list the reports of a user newest first, read from the ReportManifest table instead of an S3 listing
+def list_user_reports(user_id, page_size=None, start_key=None, vehicle_id=None):
+    try:
+        entries, next_cursor = query_user_reports(user_id, page_size, start_key, vehicle_id)
+        return {'items': [entry['object_key'] for entry in entries], 'next_cursor': next_cursor}
+    except ClientError as e:
+        return {'error': f"Error retrieving reports for user {user_id}: {e.response['Error']['Message']}"}
+
+# function to get a report and its ETag - served from the in-process cache, revalidated with If-None-Match
+def get_report_with_etag(report_name, bucket_name=None):
+    '''
+        reports never change after they are written, so a cached copy is returned as is until it is
+        REPORT_CACHE_REVALIDATE_SECONDS old and then confirmed with a conditional get
+        raises ClientError if the report cannot be read
+    '''
+    bucket_name = bucket_name or get_bucket_name()
+    cached = report_cache.get(report_name)
+    if cached and time.monotonic() - cached[2] < REPORT_CACHE_REVALIDATE_SECONDS:
+        return cached[1], cached[0]
+
+    # get specific object from bucket
+    '''
+        using client.get_object with parameters
+        Bucket=bucket_name
+        Key - object name
+        IfNoneMatch - ETag of the cached copy, S3 answers 304 if it is still current
+    '''
+    get_kwargs = {'Bucket': bucket_name, 'Key': report_name}
+    if cached:
+        get_kwargs['IfNoneMatch'] = cached[0]
+    try:
+        response = s3_client.get_object(**get_kwargs)
+    except ClientError as e:
+        if cached and e.response['Error']['Code'] in ('304', 'NotModified'):
+            report_cache.touch(report_name)
+            return cached[1], cached[0]
+        invalidate_if_missing(e, BUCKET_HANDLE)
+        raise
+    report_content = response['Body'].read()  # read the file content
+    report_data = json.loads(report_content.decode('utf-8'))
+    report_cache.put(report_name, response['ETag'], report_data, len(report_content), REPORT_CACHE_MAX_BYTES)
+    return report_data, response['ETag']
+
+# function to get the ETag of a cached report without calling S3, None if it is not cached
+def get_cached_report_etag(report_name):
+    return report_cache.get_etag(report_name)
+
+# function to get the current ETag of a report with a head request, raises ClientError if it cannot be read
+def get_report_etag(report_name, bucket_name=None):
+    try:
+        return s3_client.head_object(Bucket=bucket_name or get_bucket_name(), Key=report_name)['ETag']
+    except ClientError as e:
+        invalidate_if_missing(e, BUCKET_HANDLE)
+        raise
+
+# function to create a short lived presigned GET url for a report, the download then goes straight to S3
+def get_report_url(report_name, expires_in, bucket_name=None):
+    '''
+        using client.generate_presigned_url with parameters
+        ClientMethod - get_object
+        Params - bucket, key and the content type S3 should answer with
+        ExpiresIn - seconds the url stays valid
+        signing is local, no request is sent to S3 and a missing report only shows up when the url is used
+    '''
+    return s3_client.generate_presigned_url(
+        'get_object',
+        Params={'Bucket': bucket_name or get_bucket_name(), 'Key': report_name, 'ResponseContentType': 'application/json'},
+        ExpiresIn=expires_in
+    )
 
-# function to list all reports specific to user in given s3 bucket
-def list_user_reports(bucket_name, user_id):
-    # initialize reports with empty list 
-    reports = []
+# function to open a report for streaming, returns the get_object response with the unread body
+def open_report_stream(report_name, if_none_match=None, bucket_name=None):
+    '''
+        raises ClientError if the report cannot be read, with code 304 when if_none_match still matches
+    '''
+    get_kwargs = {'Bucket': bucket_name or get_bucket_name(), 'Key': report_name}
+    if if_none_match:
+        get_kwargs['IfNoneMatch'] = if_none_match
+    try:
+        return s3_client.get_object(**get_kwargs)
+    except ClientError as e:
+        invalidate_if_missing(e, BUCKET_HANDLE)
+        raise
+
+# function to read the raw bytes of a report, raises ClientError if it cannot be read
+def read_report_object(report_name, bucket_name=None):
     try:
-        # list objects in the bucket
-        '''
-            using client.list_objects_v2 with parameter Bucket=bucket_name
-        '''
-        response = s3_client.list_objects_v2(Bucket=bucket_name)
-
-        # check if there are contents in the response
-        if 'Contents' in response:
-            for item in response['Contents']:
-                # check if the report name includes the user_id
-                if f'{user_id}_maintenance_report_' in item['Key']:
-                    reports.append(item['Key'])
-        return reports  
+        response = s3_client.get_object(Bucket=bucket_name or get_bucket_name(), Key=report_name)
     except ClientError as e:
-        return f"Error retrieving reports for user {user_id}: {e.response['Error']['Message']}"
+        invalidate_if_missing(e, BUCKET_HANDLE)
+        raise
+    return response['Body'].read()
+
+# function to get the full history of a vehicle or a user's month in one GET, returns (history, etag)
+def get_user_history(user_id, history_id):
+    '''
+        raises LookupError if there is no such history, ClientError if it cannot be read
+    '''
+    for attempt in range(2):
+        entry = get_manifest_entry(user_id, history_id)
+        if entry is None:
+            raise LookupError(f"No history {history_id} for user {user_id}.")
+        try:
+            return get_report_with_etag(entry['object_key'])
+        except ClientError as e:
+            # the report lambda deletes the previous version right after moving the entry on, read the entry again
+            if attempt or e.response['Error']['Code'] not in ('NoSuchKey', '404'):
+                raise
 
 # function to get specific report from s3
 def get_report(report_name, bucket_name=BUCKET_NAME):
     try:
-        # get specific object from bucket
-        '''
-            using client.get_object with parameters
-            Bucket=bucket_name
-            Key - object name
-        '''
-        response = s3_client.get_object(Bucket=bucket_name, Key=report_name)
-        report_content = response['Body'].read().decode('utf-8')  # read the file content
-        report_data = json.loads(report_content)
-        return report_data  # return the JSON data
+        return get_report_with_etag(report_name, bucket_name)[0]  # return the JSON data
     except ClientError as e:
         return f"Error retrieving report: {e.response['Error']['Message']}"
 
 # function to provided report data (JSON format) into an HTML formatted string
 def json_to_html(report_data):
-    html_content = '<html><body>'
-    html_content += '<h1>Report</h1>'
-    html_content += '<ul>'
-    
-    # loop through each key-value pair in the report data and convert it to a list item
-    for key, value in report_data.items():
-        html_content += f'<li><strong>{key}:</strong> {value}</li>'
-    html_content += '</ul>'
-    html_content += '</body></html>'
-    return html_content
+    # rendered with the escaping, nesting aware renderer of report_html, routes stream render_document instead
+    return ''.join(render_document([(None, 'Report', report_data)], REPORT_HTML_CACHE_MAX_CHARS))
@@ -1,10 +1,11 @@
-import boto3
+from components.aws_clients import get_client
 from botocore.exceptions import ClientError
+from components.resource_registry import get_handle, call_with_handle, invalidate_if_missing, queue_url_handle, queue_arn_handle
 
 # initialize the SQS client
-sqs = boto3.client('sqs')
+sqs = get_client('sqs')
 
-# function to create sqs queue, invoked from app.py
+# function to create sqs queue, invoked from scripts.provision
 def create_sqs_queue(queue_name):
     try:
         # check if the queue already exists
@@ -41,9 +42,31 @@ def create_sqs_queue(queue_name):
             print(f"Error checking for existing queue: {e.response['Error']['Message']}")
             return None
 
-# function to get sqs url    
+# function to get sqs url, resolved once per process and cached in the resource registry
 def get_sqs_queue_url(queue_name):
-    return create_sqs_queue(queue_name)
+    return get_handle(queue_url_handle(queue_name), lambda: create_sqs_queue(queue_name))
+
+# helper function to look up the ARN of a queue
+def lookup_sqs_queue_arn(queue_name):
+    queue_url = get_sqs_queue_url(queue_name)
+    if queue_url is None:
+        return None
+    try:
+        '''
+            using client.get_queue_attributes with parameters
+            QueueUrl - sqs queue url
+            AttributeNames - only the QueueArn attribute is needed
+        '''
+        response = sqs.get_queue_attributes(QueueUrl=queue_url, AttributeNames=['QueueArn'])
+        return response['Attributes']['QueueArn']
+    except ClientError as e:
+        invalidate_if_missing(e, queue_url_handle(queue_name), queue_arn_handle(queue_name))
+        print(f"Error getting SQS queue ARN: {e.response['Error']['Message']}")
+        return None
+
+# function to get sqs arn, resolved once per process and cached in the resource registry
+def get_sqs_queue_arn(queue_name):
+    return get_handle(queue_arn_handle(queue_name), lambda: lookup_sqs_queue_arn(queue_name))
 
 # function to send sqs message
 def send_sqs_message(queue_url, message_body):
@@ -61,4 +84,35 @@ def send_sqs_message(queue_url, message_body):
         return response
     except ClientError as e:
         print(f"Error sending message to SQS: {e.response['Error']['Message']}")
-        return None
\ No newline at end of file
+        return None
+
+# function to send sqs message to a queue by name, the cached url is refreshed only if sqs reports the queue missing
+def send_sqs_message_to_queue(queue_name, message_body):
+    try:
+        return call_with_handle(
+            queue_url_handle(queue_name),
+            lambda: create_sqs_queue(queue_name),
+            lambda queue_url: sqs.send_message(QueueUrl=queue_url, MessageBody=message_body)
+        )
+    except ClientError as e:
+        print(f"Error sending message to SQS: {e.response['Error']['Message']}")
+        return None
+    except LookupError as e:
+        print(f"Error sending message to SQS: {e}")
+        return None
+
+# function to send up to 10 messages to a queue by name in one request
+def send_sqs_message_batch(queue_name, message_bodies):
+    '''
+        using client.send_message_batch with parameters
+        QueueUrl - sqs queue url
+        Entries - list of {Id, MessageBody}, Id is the message's index in message_bodies
+        returns the list of Failed entries (empty when every message was accepted)
+    '''
+    entries = [{'Id': str(index), 'MessageBody': body} for index, body in enumerate(message_bodies)]
+    response = call_with_handle(
+        queue_url_handle(queue_name),
+        lambda: create_sqs_queue(queue_name),
+        lambda queue_url: sqs.send_message_batch(QueueUrl=queue_url, Entries=entries)
+    )
+    return response.get('Failed', [])
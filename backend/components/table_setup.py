@@ -0,0 +1,40 @@
+from botocore.exceptions import ClientError
+
+# function to describe a table directly, returns None if it does not exist
+def describe_table(client, table_name):
+    try:
+        return client.describe_table(TableName=table_name)['Table']
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'ResourceNotFoundException':
+            return None
+        raise
+
+# function to create a pay per request table if it is missing and add any global secondary index it lacks
+def ensure_table(client, TableName, KeySchema, AttributeDefinitions, GlobalSecondaryIndexes=None):
+    '''
+        checks the table with describe_table instead of listing every table in the account
+        DynamoDB builds one new index per update_table call, the rest are added on the next run
+    '''
+    description = describe_table(client, TableName)
+    if description is None:
+        create_kwargs = {
+            'TableName': TableName,
+            'KeySchema': KeySchema,
+            'AttributeDefinitions': AttributeDefinitions,
+            'BillingMode': 'PAY_PER_REQUEST'
+        }
+        if GlobalSecondaryIndexes:
+            create_kwargs['GlobalSecondaryIndexes'] = GlobalSecondaryIndexes
+        response = client.create_table(**create_kwargs)
+        return f"Table created. Status: {response['TableDescription']['TableStatus']}"
+
+    existing_indexes = {index['IndexName'] for index in description.get('GlobalSecondaryIndexes', [])}
+    missing_indexes = [index for index in GlobalSecondaryIndexes or [] if index['IndexName'] not in existing_indexes]
+    if not missing_indexes:
+        return "Table already exists."
+    client.update_table(
+        TableName=TableName,
+        AttributeDefinitions=AttributeDefinitions,
+        GlobalSecondaryIndexUpdates=[{'Create': missing_indexes[0]}]
+    )
+    return f"Table already exists. Index {missing_indexes[0]['IndexName']} creation started."
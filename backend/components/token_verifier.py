@@ -0,0 +1,162 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+import urllib.request
+from collections import OrderedDict
+import jwt
+from jwt.algorithms import RSAAlgorithm
+
+# how long a downloaded JWKS is trusted before it is fetched again
+JWKS_TTL_SECONDS = 6 * 60 * 60
+# minimum gap between forced refreshes triggered by an unknown kid, stops random kids from hammering cognito
+JWKS_MIN_REFRESH_SECONDS = 60
+JWKS_FETCH_TIMEOUT_SECONDS = 5
+
+# validated token cache - bounded LRU, entries never outlive the token's own exp claim
+TOKEN_CACHE_MAX_ENTRIES = 10000
+TOKEN_CACHE_MAX_TTL_SECONDS = 300
+# allowed clock difference between this server and cognito when checking exp
+CLOCK_SKEW_SECONDS = 30
+
+# signing keys per issuer: {issuer: {'keys': {kid: public_key}, 'fetched_at': float}}
+_jwks_cache = {}
+_jwks_lock = threading.Lock()
+
+# sha256(token) -> (claims, cache_expires_at)
+_token_cache = OrderedDict()
+_token_lock = threading.Lock()
+
+# signed out tokens, sha256(token) -> exp - a signed out token still has a valid signature, so it is refused here until it expires
+_revoked_tokens = {}
+# how long a signed out token whose exp cannot be read stays refused, cognito access tokens live at most a day
+REVOKED_FALLBACK_SECONDS = 24 * 60 * 60
+
+
+class TokenVerificationError(Exception):
+    pass
+
+
+# function to build the issuer url of a cognito user pool
+def get_issuer(region, user_pool_id):
+    return f"https://cognito-idp.{region}.amazonaws.com/{user_pool_id}"
+
+# function to download the public signing keys of a user pool
+def fetch_jwks(issuer):
+    with urllib.request.urlopen(f"{issuer}/.well-known/jwks.json", timeout=JWKS_FETCH_TIMEOUT_SECONDS) as response:
+        jwks = json.loads(response.read().decode('utf-8'))
+    return {key['kid']: RSAAlgorithm.from_jwk(json.dumps(key)) for key in jwks.get('keys', [])}
+
+# function to get the public key for a kid, refreshing the JWKS when the kid is unknown or the set is stale
+def get_signing_key(issuer, kid):
+    with _jwks_lock:
+        now = time.monotonic()
+        entry = _jwks_cache.get(issuer)
+        if entry and kid in entry['keys'] and now - entry['fetched_at'] < JWKS_TTL_SECONDS:
+            return entry['keys'][kid]
+        # unknown kid (key rotation) or stale set - refresh, but not more than once per JWKS_MIN_REFRESH_SECONDS
+        if entry is None or now - entry['fetched_at'] >= JWKS_MIN_REFRESH_SECONDS:
+            try:
+                entry = {'keys': fetch_jwks(issuer), 'fetched_at': now}
+                _jwks_cache[issuer] = entry
+            except Exception as e:
+                logging.error("Error fetching JWKS from %s: %s", issuer, e)
+                if entry is None:
+                    raise TokenVerificationError("Signing keys are unavailable.")
+        key = entry['keys'].get(kid)
+        if key is None:
+            raise TokenVerificationError("Unknown signing key.")
+        return key
+
+# helper function to read a validated token from the cache
+def _get_cached_claims(cache_key):
+    with _token_lock:
+        entry = _token_cache.get(cache_key)
+        if entry is None:
+            return None
+        claims, expires_at = entry
+        if expires_at <= time.time():
+            del _token_cache[cache_key]
+            return None
+        _token_cache.move_to_end(cache_key)  # mark as most recently used
+        return claims
+
+# helper function to add a validated token to the cache, evicting the least recently used entries
+def _cache_claims(cache_key, claims):
+    expires_at = min(claims['exp'], time.time() + TOKEN_CACHE_MAX_TTL_SECONDS)
+    with _token_lock:
+        _token_cache[cache_key] = (claims, expires_at)
+        _token_cache.move_to_end(cache_key)
+        while len(_token_cache) > TOKEN_CACHE_MAX_ENTRIES:
+            _token_cache.popitem(last=False)
+
+# helper function to hash a token into its cache and revocation key
+def _token_key(token):
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+# function to refuse a token from now until it expires, used after logout
+# the revocation is kept by this process only, other app workers still accept the token until its exp
+def revoke_token(token):
+    try:
+        expires_at = jwt.decode(token, options={'verify_signature': False}).get('exp')
+    except jwt.PyJWTError:
+        expires_at = None
+    if not isinstance(expires_at, (int, float)):
+        expires_at = time.time() + REVOKED_FALLBACK_SECONDS
+    now = time.time()
+    cache_key = _token_key(token)
+    with _token_lock:
+        _token_cache.pop(cache_key, None)
+        # expired tokens fail the exp check anyway, their revocations are dropped
+        for expired_key in [key for key, exp in _revoked_tokens.items() if exp <= now]:
+            del _revoked_tokens[expired_key]
+        _revoked_tokens[cache_key] = expires_at + CLOCK_SKEW_SECONDS
+
+# helper function to check whether a token was signed out
+def _is_revoked(cache_key):
+    with _token_lock:
+        expires_at = _revoked_tokens.get(cache_key)
+        return expires_at is not None and expires_at > time.time()
+
+# function to verify a cognito access token locally and return its claims
+def verify_access_token(token, region, user_pool_id, client_id):
+    '''
+        checks - RS256 signature against the pool's JWKS, exp, iss, token_use == access
+                 and client_id (access tokens carry client_id instead of aud)
+        and that the token was not signed out through revoke_token
+        raises TokenVerificationError if any check fails, or if client_id is missing - without it a token
+        from any app client of the pool would be accepted
+    '''
+    if not client_id:
+        raise TokenVerificationError("App client id is not configured.")
+    if not token:
+        raise TokenVerificationError("Missing token.")
+    cache_key = _token_key(token)
+    if _is_revoked(cache_key):
+        raise TokenVerificationError("Token has been signed out.")
+    claims = _get_cached_claims(cache_key)
+    if claims is not None:
+        return claims
+
+    issuer = get_issuer(region, user_pool_id)
+    try:
+        header = jwt.get_unverified_header(token)
+        key = get_signing_key(issuer, header.get('kid'))
+        claims = jwt.decode(
+            token,
+            key=key,
+            algorithms=['RS256'],
+            issuer=issuer,
+            leeway=CLOCK_SKEW_SECONDS,
+            options={'require': ['exp', 'iss', 'token_use'], 'verify_aud': False}
+        )
+    except jwt.PyJWTError as e:
+        raise TokenVerificationError(f"Invalid token: {e}")
+    if claims.get('token_use') != 'access':
+        raise TokenVerificationError("Token is not an access token.")
+    if claims.get('client_id') != client_id:
+        raise TokenVerificationError("Token was issued to a different client.")
+
+    _cache_claims(cache_key, claims)
+    return claims
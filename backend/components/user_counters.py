@@ -0,0 +1,83 @@
+import logging
+from components.aws_clients import get_resource
+from botocore.exceptions import BotoCoreError, ClientError
+from components.table_setup import ensure_table
+
+# initialize DynamoDB client
+dynamodb = get_resource('dynamodb')
+
+# define table name
+table_name = 'UserCounters'
+
+# counter attributes kept per user
+VEHICLE_COUNT = 'vehicle_count'
+MAINTENANCE_COUNT = 'maintenance_count'
+COUNTERS = (VEHICLE_COUNT, MAINTENANCE_COUNT)
+
+# create the UserCounters table in DynamoDB, invoked from scripts.provision
+def create_user_counters_table():
+    try:
+        # create the table if describe_table does not find it
+        '''
+            using client.create_table with parameters
+            TableName - name of the table
+            KeySchema - one item per user holding all of the user's counters
+            AttributeDefinitions - describe the key schema for the table
+            BillingMode - pay per request for unpredictable workloads
+        '''
+        return ensure_table(
+            dynamodb.meta.client,
+            TableName=table_name,
+            KeySchema=[{'AttributeName': 'user_id', 'KeyType': 'HASH'}],
+            AttributeDefinitions=[{'AttributeName': 'user_id', 'AttributeType': 'S'}]
+        )
+    except ClientError as e:
+        return f"Error creating table: {e.response['Error']['Message']}"
+    except Exception as e:
+        return f"An error occurred: {str(e)}"
+
+# initialize the table
+table = dynamodb.Table(table_name)
+
+# function to add to (or subtract from) a user's counters with one atomic update, e.g. add_to_counters(user_id, vehicle_count=1)
+def add_to_counters(user_id, **deltas):
+    '''
+        using client.update_item with parameters
+        Key - the user's counter item, created by the first update
+        UpdateExpression - ADD increments each counter atomically, concurrent updates never overwrite each other
+        a failed update (an error response, a connection error or a timeout) is logged rather than failing the
+        request - the item it counts is already written, so a retried request would store it twice
+        scripts.reconcile_user_counters repairs the drift
+    '''
+    deltas = {name: delta for name, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    try:
+        table.update_item(
+            Key={'user_id': user_id},
+            UpdateExpression="ADD " + ", ".join(f"#{name} :{name}" for name in deltas),
+            ExpressionAttributeNames={f"#{name}": name for name in deltas},
+            ExpressionAttributeValues={f":{name}": delta for name, delta in deltas.items()}
+        )
+    except ClientError as e:
+        logging.error("Error updating counters %s of user %s: %s", deltas, user_id, e.response['Error']['Message'])
+    except BotoCoreError as e:
+        logging.error("Error updating counters %s of user %s: %s", deltas, user_id, e)
+
+# function to read a user's counters with a single get_item, missing counters are 0
+def get_user_counts(user_id):
+    item = table.get_item(Key={'user_id': user_id}).get('Item', {})
+    return {name: int(item.get(name, 0)) for name in COUNTERS}
+
+# function to remove a user's counter item, used when the whole account is deleted
+def delete_user_counters(user_id):
+    table.delete_item(Key={'user_id': user_id})
+
+# function to overwrite a user's counters with recomputed values, used by the reconciliation job
+def set_user_counts(user_id, counts):
+    table.update_item(
+        Key={'user_id': user_id},
+        UpdateExpression="SET " + ", ".join(f"#{name} = :{name}" for name in counts),
+        ExpressionAttributeNames={f"#{name}": name for name in counts},
+        ExpressionAttributeValues={f":{name}": value for name, value in counts.items()}
+    )
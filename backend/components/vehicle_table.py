@@ -1,32 +1,46 @@
-import boto3
+from components.aws_clients import get_resource
 from botocore.exceptions import ClientError
+import time
 import uuid
 from boto3.dynamodb.conditions import Key
+from components.pagination import query_page
+from components.table_setup import ensure_table
+from components.user_counters import add_to_counters, VEHICLE_COUNT
 
 # initialize DynamoDB client
-dynamodb = boto3.resource('dynamodb')
+dynamodb = get_resource('dynamodb')
 
 # define table name
 table_name = 'Vehicles'
 
-# create the Vehicles table in DynamoDB, invoked from app.py
+# global secondary index used to list vehicles of a single user without scanning the table
+USER_INDEX_NAME = 'user_id-index'
+USER_INDEX = {
+    'IndexName': USER_INDEX_NAME,
+    'KeySchema': [
+        {'AttributeName': 'user_id', 'KeyType': 'HASH'},  # partition key to group vehicles per user
+        {'AttributeName': 'vehicle_id', 'KeyType': 'RANGE'}  # sort key to give pages a stable order
+    ],
+    'Projection': {'ProjectionType': 'ALL'}
+}
+# attributes of a LastEvaluatedKey from the user_id index, table key plus index key
+USER_INDEX_CURSOR_KEYS = ('user_id', 'vehicle_id')
+
+# create the Vehicles table in DynamoDB, invoked from scripts.provision
 def create_vehicle_table():
     try:
-        # Check if the table already exists
-        existing_tables = dynamodb.tables.all()
-        if table_name in [table.name for table in existing_tables]:
-            return "Table already exists."
-        
-        # create the table
+        # create the table if describe_table does not find it, and add the user_id index if it is missing
         '''
             using client.create_table with parameters
             TableName - name of the table
             KeySchema - list of dictionaries - define partition key and sort key
             AttributeDefinitions - describe the key schema for the table
+            GlobalSecondaryIndexes - user_id index so a user's vehicles can be queried instead of scanned
             BillingMode - controls how you are charged for read and write throughput 
                         - using pay per request for unpredictable workloads
         '''
-        table = dynamodb.create_table(
+        return ensure_table(
+            dynamodb.meta.client,
             TableName=table_name,
             KeySchema=[
                 {
@@ -48,9 +62,8 @@ def create_vehicle_table():
                     'AttributeType': 'S'  # String
                 }
             ],
-            BillingMode='PAY_PER_REQUEST'            
+            GlobalSecondaryIndexes=[USER_INDEX]
         )
-        return f"Table created. Status: {table.table_status}"
     except ClientError as e:
         return f"Error creating table: {e.response['Error']['Message']}"
     except Exception as e:
@@ -78,35 +91,41 @@ def create_vehicle(make, model, year, user_id):
                 'year': year
             }
         )
+        add_to_counters(user_id, **{VEHICLE_COUNT: 1})
         return "Vehicle entry added successfully."
     except ClientError as e:
         return f"Error creating vehicle: {e.response['Error']['Message']}"
 
+# helper function to query one page of a user's vehicles from the user_id index
+def query_user_vehicles(user_id, page_size=None, start_key=None):
+    return query_page(
+        table,
+        page_size=page_size,
+        start_key=start_key,
+        IndexName=USER_INDEX_NAME,
+        KeyConditionExpression=Key('user_id').eq(user_id)
+    )
+
 # function to get all vehicles associated with specific user
-def get_all_vehicles(user_id):
+def get_all_vehicles(user_id, page_size=None, start_key=None):
     try:
-        # use scan to get all items and filter them based on user_id
-        response = table.scan()  
-
-        # filter the results to only include items for the specified user_id
-        vehicles = [item for item in response['Items'] if item.get('user_id') == user_id]
-        return vehicles
+        # query the user_id index, page_size None returns every page
+        vehicles, next_cursor = query_user_vehicles(user_id, page_size, start_key)
+        return {'items': vehicles, 'next_cursor': next_cursor}
     except ClientError as e:
         return {'error': f"Error retrieving vehicles: {e.response['Error']['Message']}"}
     except Exception as e:
         return {'error': str(e)}
 
 # function to retrieve all vehicles for a specific user with formatted "Make-Model-Year".
-def get_vehicles_list(user_id):
+def get_vehicles_list(user_id, page_size=None, start_key=None):
     try:
-        # use scan to get all items and filter them based on user_id
-        response = table.scan()  
-        vehicles = [item for item in response['Items'] if item.get('user_id') == user_id]
+        vehicles, next_cursor = query_user_vehicles(user_id, page_size, start_key)
 
         # format each vehicle item as "Make-Model-Year"
         for vehicle in vehicles:
             vehicle['display_name'] = f"{vehicle['make']} {vehicle['model']} {vehicle['year']}"
-        return vehicles
+        return {'items': vehicles, 'next_cursor': next_cursor}
     except ClientError as e:
         return {'error': f"Error retrieving vehicles: {e.response['Error']['Message']}"}
     except Exception as e:
@@ -127,6 +146,42 @@ def get_vehicle(vehicle_id):
     except Exception as e:
         return {'error': str(e)}
 
+# batch_get_item takes at most 100 keys per call, unprocessed keys are retried this many times with backoff
+BATCH_GET_SIZE = 100
+BATCH_GET_ATTEMPTS = 5
+BATCH_GET_BACKOFF_SECONDS = 0.05
+
+# function to get the details of many of a user's vehicles as {vehicle_id: vehicle}, missing vehicles are left out
+def get_vehicle_map(user_id, vehicle_ids):
+    '''
+        using resource.batch_get_item with parameters
+        RequestItems - up to 100 keys of the Vehicles table per call, only the attributes a listing shows
+        UnprocessedKeys - keys DynamoDB did not get to (throttling, 16 MB limit), asked for again after a backoff
+        raises ClientError, or RuntimeError if keys are still unprocessed after BATCH_GET_ATTEMPTS
+    '''
+    vehicle_ids = list(dict.fromkeys(vehicle_id for vehicle_id in vehicle_ids if vehicle_id))  # de-duplicated, order kept
+    vehicles = {}
+    for offset in range(0, len(vehicle_ids), BATCH_GET_SIZE):
+        request_items = {
+            table_name: {
+                'Keys': [{'vehicle_id': vehicle_id, 'user_id': user_id} for vehicle_id in vehicle_ids[offset:offset + BATCH_GET_SIZE]],
+                'ProjectionExpression': 'vehicle_id, make, model, #yr',
+                'ExpressionAttributeNames': {'#yr': 'year'}  # year is a reserved word
+            }
+        }
+        for attempt in range(BATCH_GET_ATTEMPTS):
+            response = dynamodb.batch_get_item(RequestItems=request_items)
+            for vehicle in response.get('Responses', {}).get(table_name, []):
+                vehicle['display_name'] = f"{vehicle.get('make')} {vehicle.get('model')} {vehicle.get('year')}"
+                vehicles[vehicle['vehicle_id']] = vehicle
+            request_items = response.get('UnprocessedKeys')
+            if not request_items:
+                break
+            time.sleep(BATCH_GET_BACKOFF_SECONDS * 2 ** attempt)
+        else:
+            raise RuntimeError(f"Vehicles still unprocessed after {BATCH_GET_ATTEMPTS} batch_get_item attempts.")
+    return vehicles
+
 # function to update specific vehicle details for a specific user
 def update_vehicle(vehicle_id, user_id, make=None, model=None, year=None):
     
@@ -179,14 +234,18 @@ def delete_vehicle(vehicle_id, user_id):
     '''
         using client.delete_item with parameters
         Key - representing the primary key of the item to delete.
+        ReturnValues - ALL_OLD, the counter only goes down when an item was really deleted
     '''
     try:
-        table.delete_item(
+        response = table.delete_item(
             Key={
                 'vehicle_id': vehicle_id,
                 'user_id': user_id
-            }
+            },
+            ReturnValues='ALL_OLD'
         )
+        if 'Attributes' in response:
+            add_to_counters(user_id, **{VEHICLE_COUNT: -1})
         return "Vehicle deleted successfully."
     except ClientError as e:
         return f"Error deleting vehicle: {e.response['Error']['Message']}"
\ No newline at end of file
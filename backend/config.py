@@ -0,0 +1,68 @@
+import os
+
+# helper function to read a true/false setting from the environment
+def env_flag(name, default=False):
+    return os.environ.get(name, str(default)).strip().lower() in ('1', 'true', 'yes', 'on')
+
+# transactional outbox - when enabled, maintenance records and their report events are written in one DynamoDB transaction
+MAINTENANCE_OUTBOX_ENABLED = env_flag('MAINTENANCE_OUTBOX_ENABLED')
+# run the outbox relay as a background thread of the web app (set false when scripts.outbox_relay runs on its own)
+OUTBOX_RELAY_IN_APP = env_flag('OUTBOX_RELAY_IN_APP', True)
+OUTBOX_RELAY_INTERVAL_SECONDS = float(os.environ.get('OUTBOX_RELAY_INTERVAL_SECONDS', '1'))
+
+# report consumer - SQS event source mapping settings for the report lambda
+# batches larger than 10 need a batching window of at least 1 second
+REPORT_BATCH_SIZE = int(os.environ.get('REPORT_BATCH_SIZE', '10'))
+REPORT_BATCH_WINDOW_SECONDS = int(os.environ.get('REPORT_BATCH_WINDOW_SECONDS', '1'))
+# records of one batch processed concurrently inside the lambda
+REPORT_WORKERS = int(os.environ.get('REPORT_WORKERS', '8'))
+
+# folder where built lambda packages are cached, keyed by the hash of their sources
+LAMBDA_BUILD_CACHE_DIR = os.environ.get('LAMBDA_BUILD_CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.build'))
+
+# AWS resources managed by scripts.provision
+QUEUE_NAME = os.environ.get('QUEUE_NAME', 'VehicleMaintenanceQueue')  # SQS queue name
+REPORT_FUNCTION_NAME = os.environ.get('REPORT_FUNCTION_NAME', 'GenerateReportFunction')  # Lambda function name
+LAMBDA_ROLE_ARN = os.environ.get('LAMBDA_ROLE_ARN', 'arn:aws:iam::118706183796:role/LabRole')  # role assumed by the lambda
+# state manifest written by scripts.provision and read by the web app at startup
+STATE_MANIFEST_PATH = os.environ.get('STATE_MANIFEST_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.aws_state.json'))
+PROVISION_WORKERS = int(os.environ.get('PROVISION_WORKERS', '8'))
+# provision from the web app when no manifest exists yet - convenient locally, leave off for multi worker servers
+PROVISION_ON_STARTUP = env_flag('PROVISION_ON_STARTUP')
+
+# parsed report cache - bounded by the size of the cached report bodies
+REPORT_CACHE_MAX_BYTES = int(os.environ.get('REPORT_CACHE_MAX_BYTES', str(32 * 1024 * 1024)))
+# cached reports are confirmed with a conditional get once they are older than this
+REPORT_CACHE_REVALIDATE_SECONDS = float(os.environ.get('REPORT_CACHE_REVALIDATE_SECONDS', '300'))
+
+# how /api/reports/<name> serves a report when the request has no 'mode' parameter
+# proxy - parsed and cached by the app, url - json with a presigned S3 url, redirect - 302 to a presigned url,
+# stream - S3 body piped through in chunks without buffering
+REPORT_DOWNLOAD_MODE = os.environ.get('REPORT_DOWNLOAD_MODE', 'proxy')
+REPORT_PRESIGNED_URL_SECONDS = int(os.environ.get('REPORT_PRESIGNED_URL_SECONDS', '300'))
+REPORT_STREAM_CHUNK_BYTES = int(os.environ.get('REPORT_STREAM_CHUNK_BYTES', str(64 * 1024)))
+# rendered html report sections cached by report ETag, bounded by their total length in characters
+REPORT_HTML_CACHE_MAX_CHARS = int(os.environ.get('REPORT_HTML_CACHE_MAX_CHARS', str(16 * 1024 * 1024)))
+# reports fetched from S3 at the same time while a zip export is streamed, shared by all exports of the process
+REPORT_EXPORT_WORKERS = int(os.environ.get('REPORT_EXPORT_WORKERS', '8'))
+# report aggregation - '' writes one S3 object per maintenance event, 'vehicle' keeps one history per vehicle,
+# 'month' one history per user and month; histories are appended to by the report lambda
+REPORT_AGGREGATION = os.environ.get('REPORT_AGGREGATION', '')
+
+# dashboard summary - sections are fetched concurrently on a pool shared by all requests
+DASHBOARD_WORKERS = int(os.environ.get('DASHBOARD_WORKERS', '16'))
+# a section still running after this long is reported as timed out and the summary is returned without it
+DASHBOARD_SECTION_TIMEOUT_SECONDS = float(os.environ.get('DASHBOARD_SECTION_TIMEOUT_SECONDS', '2'))
+
+# background jobs deleting a vehicle or a whole account with everything that belongs to it
+DELETE_JOB_WORKERS = int(os.environ.get('DELETE_JOB_WORKERS', '2'))
+
+# AWS clients shared by every component (components.aws_clients)
+# connection pool per client - keep it at least as large as the number of threads serving requests
+AWS_MAX_POOL_CONNECTIONS = int(os.environ.get('AWS_MAX_POOL_CONNECTIONS', '50'))
+AWS_CONNECT_TIMEOUT_SECONDS = float(os.environ.get('AWS_CONNECT_TIMEOUT_SECONDS', '2'))
+AWS_READ_TIMEOUT_SECONDS = float(os.environ.get('AWS_READ_TIMEOUT_SECONDS', '10'))
+# 'adaptive' adds client side rate limiting on throttling to the 'standard' retries, attempts include the first call
+AWS_RETRY_MODE = os.environ.get('AWS_RETRY_MODE', 'adaptive')
+AWS_MAX_ATTEMPTS = int(os.environ.get('AWS_MAX_ATTEMPTS', '3'))
+AWS_TCP_KEEPALIVE = env_flag('AWS_TCP_KEEPALIVE', True)
@@ -0,0 +1,43 @@
+from flask import Blueprint, request, jsonify
+from routes.auth_routes import extract_user_id_from_token
+from components.cascade_delete import start_account_delete, get_job, retry_job
+
+# create a blueprint for account routes
+account_bp = Blueprint('account', __name__)
+
+# route to delete every vehicle, maintenance record and report of the user, runs as a background job
+@account_bp.route('/account', methods=['DELETE'])
+def delete_account_route():
+    user_id = extract_user_id_from_token(request)  # extract the user id from the auth token
+    if not user_id:
+        return jsonify({'error': 'Unauthorized'}), 401
+    job_id = start_account_delete(user_id)
+    response = jsonify({'message': 'Account deletion started.', 'job_id': job_id})
+    response.headers['Location'] = f"/jobs/{job_id}"
+    return response, 202
+
+# route to follow the progress of a delete job
+@account_bp.route('/jobs/<job_id>', methods=['GET'])
+def get_job_route(job_id):
+    user_id = extract_user_id_from_token(request)  # extract the user id from the auth token
+    if not user_id:
+        return jsonify({'error': 'Unauthorized'}), 401
+    job = get_job(job_id, user_id)
+    if job is None:
+        return jsonify({'error': 'Job not found.'}), 404
+    return jsonify(job), 200
+
+# route to run a failed delete job again, or one whose worker stopped before finishing it
+@account_bp.route('/jobs/<job_id>/retry', methods=['POST'])
+def retry_job_route(job_id):
+    user_id = extract_user_id_from_token(request)  # extract the user id from the auth token
+    if not user_id:
+        return jsonify({'error': 'Unauthorized'}), 401
+    started = retry_job(job_id, user_id)
+    if started is None:
+        return jsonify({'error': 'Job not found.'}), 404
+    if not started:
+        return jsonify({'error': 'Job is done or still running.'}), 409
+    response = jsonify({'message': 'Job restarted.', 'job_id': job_id})
+    response.headers['Location'] = f"/jobs/{job_id}"
+    return response, 202
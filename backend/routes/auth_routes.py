@@ -1,14 +1,11 @@
 # auth_routes.py
 from flask import Blueprint, request, jsonify
 from components.cognito_service import register_user, login_user, logout_user, get_user_profile, forgot_password, reset_password
-from components.cognito_service import get_user_pool_id
+from components.cognito_service import get_user_pool_id, validate_token
 
 # create blueprint for auth routes
 auth_bp = Blueprint('auth', __name__)
 
-# get user pool id
-user_pool_id = get_user_pool_id()
-
 # route to register a user in cognito user pool
 @auth_bp.route('/register', methods=['POST'])
 def register():
@@ -16,7 +13,7 @@ def register():
     username = data.get("username")
     password = data.get("password")
     email = data.get("email")
-    result = register_user(user_pool_id, username, password, email) # call register_user function in cognito_service.py
+    result = register_user(get_user_pool_id(), username, password, email) # call register_user function in cognito_service.py
     return jsonify(result)
 
 # route to enable user login
@@ -25,7 +22,7 @@ def login():
     data = request.get_json()
     username = data.get("username")
     password = data.get("password")
-    result = login_user(user_pool_id, username, password) # call login_user function in cognito_service.py
+    result = login_user(get_user_pool_id(), username, password) # call login_user function in cognito_service.py
 
     # check if tokens and user name are present in the result, if not display error
     if 'AccessToken' in result and 'IdToken' in result:
@@ -66,21 +63,18 @@ def extract_user_id_from_token(request):
     token = request.headers.get('Authorization') # retrieve auth header from request
     if not token:
         return None
-    # if the token has a 'Bearer' prefix, remove it to extract the actual token
-    if token.startswith("Bearer "):
-        token = token.split(" ")[1]
-    try:
-        user_data = get_user_profile(token)
-        return user_data.get("Username")  
-    except Exception as e:
+    # verify the token signature locally instead of calling cognito get_user on every request
+    claims = validate_token(token)
+    if claims is None:
         return None
+    return claims.get("username")
 
 # route for requesting password reset
 @auth_bp.route('/forgot-password', methods=['POST'])
 def forgot_password_route():
     data = request.get_json()
     email = data.get("email")
-    result = forgot_password(user_pool_id, email) # call forgot_password function in cognito_service.py
+    result = forgot_password(get_user_pool_id(), email) # call forgot_password function in cognito_service.py
     if "error" in result:
         return jsonify(result), 400
     return jsonify(result)
@@ -93,7 +87,7 @@ def reset_password_route():
     otp = data.get("otp")
     new_password = data.get("newPassword")
 
-    result = reset_password(user_pool_id, email, otp, new_password) # call reset_password function in cognito_service.py
+    result = reset_password(get_user_pool_id(), email, otp, new_password) # call reset_password function in cognito_service.py
     if "error" in result:
         return jsonify(result), 400
     return jsonify(result)
\ No newline at end of file
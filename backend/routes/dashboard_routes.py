@@ -0,0 +1,83 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from flask import Blueprint, request, jsonify
+from routes.auth_routes import extract_user_id_from_token
+from components.user_counters import get_user_counts, VEHICLE_COUNT, MAINTENANCE_COUNT
+from components.maintenance_table import count_upcoming_maintenance_records
+from components.vehicle_table import get_vehicles_list
+from components.s3_service import list_user_reports
+from config import DASHBOARD_WORKERS, DASHBOARD_SECTION_TIMEOUT_SECONDS
+
+# create a blueprint for dashboard routes
+dashboard_bp = Blueprint('dashboard', __name__)
+
+# pool shared by every summary request, bounds the AWS calls the dashboard can have in flight
+executor = ThreadPoolExecutor(max_workers=DASHBOARD_WORKERS, thread_name_prefix='dashboard')
+
+# days ahead counted as upcoming maintenance, same window as /maintenance/upcoming/count
+UPCOMING_DAYS = 30
+
+# helper function to raise the error a component returned as {'error': ...}
+def unwrap(result):
+    if 'error' in result:
+        raise RuntimeError(result['error'])
+    return result['items']
+
+# helper function to run one section and time it, returns (value, milliseconds)
+def run_section(function):
+    start = time.perf_counter()
+    value = function()
+    return value, (time.perf_counter() - start) * 1000
+
+# sections of the summary as {name: function(user_id)}, each one replaces a call the dashboard made on its own
+SECTIONS = {
+    'counts': get_user_counts,  # /vehicles/count and /maintenance/count
+    'upcoming_maintenance_count': lambda user_id: count_upcoming_maintenance_records(user_id, UPCOMING_DAYS),
+    'vehicles': lambda user_id: unwrap(get_vehicles_list(user_id)),  # /vehiclesList
+    'reports': lambda user_id: unwrap(list_user_reports(user_id))  # /api/reports
+}
+
+# route to get everything the dashboard shows in one call
+@dashboard_bp.route('/dashboard/summary', methods=['GET'])
+def get_dashboard_summary():
+    user_id = extract_user_id_from_token(request)  # token is validated once for every section
+    if not user_id:
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    start = time.perf_counter()
+    futures = {name: executor.submit(run_section, lambda function=function: function(user_id)) for name, function in SECTIONS.items()}
+    wait(futures.values(), timeout=DASHBOARD_SECTION_TIMEOUT_SECONDS)
+
+    # a failed or slow section is reported as such, the rest of the summary is still returned
+    values = {}
+    sections = {}
+    for name, future in futures.items():
+        if not future.done():
+            future.cancel()  # only helps if it has not started yet, a running AWS call finishes in the background
+            sections[name] = {'status': 'timeout', 'ms': round(DASHBOARD_SECTION_TIMEOUT_SECONDS * 1000, 1)}
+            continue
+        try:
+            values[name], elapsed_ms = future.result()
+            sections[name] = {'status': 'ok', 'ms': round(elapsed_ms, 1)}
+        except Exception as e:
+            logging.error("Dashboard section %s failed for user %s: %s", name, user_id, e)
+            sections[name] = {'status': 'error', 'error': str(e)}
+
+    counts = values.get('counts', {})
+    summary = {
+        'vehicle_count': counts.get(VEHICLE_COUNT),
+        'maintenance_count': counts.get(MAINTENANCE_COUNT),
+        'upcoming_maintenance_count': values.get('upcoming_maintenance_count'),
+        'vehicles': values.get('vehicles'),
+        'reports': values.get('reports'),
+        'complete': all(section['status'] == 'ok' for section in sections.values()),
+        'sections': sections,
+        'total_ms': round((time.perf_counter() - start) * 1000, 1)
+    }
+    response = jsonify(summary)
+    # the same timings for browser developer tools
+    response.headers['Server-Timing'] = ', '.join(
+        f"{name};dur={section['ms']}" for name, section in sections.items() if 'ms' in section
+    )
+    return response
@@ -0,0 +1,29 @@
+from flask import Blueprint, request, jsonify
+from routes.auth_routes import extract_user_id_from_token
+from components.bulk_import import import_rows
+
+# create a blueprint for import routes
+import_bp = Blueprint('import', __name__)
+
+# content types accepted when no 'format' query parameter is given
+CONTENT_TYPE_FORMATS = {
+    'text/csv': 'csv',
+    'application/x-ndjson': 'ndjson',
+    'application/ndjson': 'ndjson'
+}
+
+# route to import vehicles and maintenance history from a CSV or NDJSON upload
+# the body is read as a stream, so the upload never has to fit in memory
+@import_bp.route('/import', methods=['POST'])
+def bulk_import_route():
+    user_id = extract_user_id_from_token(request)  # extract the user id from the auth token
+    if not user_id:
+        return jsonify({'error': 'Unauthorized'}), 401
+    input_format = request.args.get('format') or CONTENT_TYPE_FORMATS.get(request.mimetype)
+    try:
+        summary = import_rows(user_id, request.stream, input_format)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': f"Import failed: {str(e)}"}), 500
+    return jsonify(summary), 200
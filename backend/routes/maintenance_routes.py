@@ -1,13 +1,27 @@
 from flask import Blueprint, request, jsonify
-from maintenance_utils import sort_records_by_date
-from maintenance_utils.count_records import count_records
+from components.user_counters import get_user_counts, MAINTENANCE_COUNT
 from routes.auth_routes import extract_user_id_from_token
-from components.maintenance_table import create_maintenance_record, get_all_maintenance_records
-from maintenance_utils.count_upcoming_maintenance import count_upcoming_maintenance
+from components.maintenance_table import create_maintenance_record, get_all_maintenance_records, count_upcoming_maintenance_records, get_upcoming_maintenance_records, NEXT_SERVICE_CURSOR_KEYS
+from components.pagination import get_page_args, NEXT_CURSOR_HEADER
+from components.vehicle_table import get_vehicle_map
 
 # create blueprint for maintenance routes
 maintenance_bp = Blueprint('maintenance', __name__)
 
+# window of the upcoming maintenance routes, overridable with the 'days' query parameter
+UPCOMING_DAYS = 30
+MAX_UPCOMING_DAYS = 366
+
+# helper function to read the 'days' query parameter, raises ValueError if it is not a sensible number of days
+def get_upcoming_days(request):
+    try:
+        days = int(request.args.get('days', UPCOMING_DAYS))
+    except ValueError:
+        raise ValueError("days must be a whole number.")
+    if not 0 <= days <= MAX_UPCOMING_DAYS:
+        raise ValueError(f"days must be between 0 and {MAX_UPCOMING_DAYS}.")
+    return days
+
 # route for adding maintenance record in maintenance table
 @maintenance_bp.route('/maintenance', methods=['POST'])
 def add_maintenance():
@@ -30,10 +44,33 @@ def get_maintenance_records():
     user_id = extract_user_id_from_token(request) # extract the user id from auth token
     if not user_id:
         return jsonify({"error": "Unauthorized"}), 401
-    response = get_all_maintenance_records(user_id) # call get_all_maintenance_records function in maintenance table
-    records = response.get("items", [])
-    sorted_records = sort_records_by_date(records, 'next_service_date') # sort records by next_service_date
-    return jsonify({'items': sorted_records})
+    # optional 'limit', 'cursor' and 'order' (asc or desc by next_service_date) query parameters
+    # and 'include=vehicle' to add make, model, year and display_name of each record's vehicle
+    order = request.args.get('order', 'asc')
+    if order not in ('asc', 'desc'):
+        return jsonify({"error": "order must be asc or desc"}), 400
+    try:
+        page_size, start_key = get_page_args(request, cursor_keys=NEXT_SERVICE_CURSOR_KEYS, owner={'user_id': user_id})
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    # call get_all_maintenance_records function in maintenance table, records come back sorted by next_service_date
+    # from the index - records without next_service_date are not listed and a record just created may lag behind
+    response = get_all_maintenance_records(user_id, page_size, start_key, descending=order == 'desc')
+    if 'error' in response:
+        return jsonify(response), 500
+    records = response['items']
+    if request.args.get('include') == 'vehicle':
+        # one batch_get_item per 100 distinct vehicles instead of a lookup per record
+        try:
+            vehicles = get_vehicle_map(user_id, (record.get('vehicle_id') for record in records))
+        except Exception as e:
+            return jsonify({"error": f"Error retrieving vehicle details: {str(e)}"}), 500
+        for record in records:
+            record['vehicle'] = vehicles.get(record.get('vehicle_id'))  # None if the vehicle was deleted
+    result = jsonify({'items': records})
+    if response['next_cursor']:
+        result.headers[NEXT_CURSOR_HEADER] = response['next_cursor']
+    return result
 
 # route to count total maintenance records in the table
 @maintenance_bp.route('/maintenance/count', methods=['GET'])
@@ -42,7 +79,7 @@ def count_maintenance_route():
     if not user_id:
         return jsonify({'error': 'Unauthorized'}), 401
     try:
-        maintenance_count = count_records("Maintenance", user_id)
+        maintenance_count = get_user_counts(user_id)[MAINTENANCE_COUNT]  # one get_item on the user's counters
         return jsonify({'maintenance_count': maintenance_count})
     except Exception as e:
         return jsonify({'error': f"Failed to count maintenance records: {str(e)}"}), 500
@@ -54,9 +91,34 @@ def count_upcoming_maintenance_route():
     if not user_id:
         return jsonify({'error': 'Unauthorized'}), 401
 
-    # get 'days' as 30 for upcoming maintenance and table_name as 'Maintenance'
     try:
-        upcoming_maintenance_count = count_upcoming_maintenance(user_id, 30, 'Maintenance')
+        days = get_upcoming_days(request)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    # range query on the next_service_date index, only the count comes back
+    try:
+        upcoming_maintenance_count = count_upcoming_maintenance_records(user_id, days)
         return jsonify({'upcoming_maintenance_count': upcoming_maintenance_count})
     except Exception as e:
-        return jsonify({'error': f"Failed to count upcoming maintenance records: {str(e)}"}), 500
\ No newline at end of file
+        return jsonify({'error': f"Failed to count upcoming maintenance records: {str(e)}"}), 500
+
+# route to list maintenance records due in the next 30 days (or 'days'), soonest first
+@maintenance_bp.route('/maintenance/upcoming', methods=['GET'])
+def get_upcoming_maintenance_route():
+    user_id = extract_user_id_from_token(request)  # extract the user id from the auth token
+    if not user_id:
+        return jsonify({'error': 'Unauthorized'}), 401
+    # optional 'limit' and 'cursor' query parameters, without 'limit' every due record is returned
+    try:
+        days = get_upcoming_days(request)
+        page_size, start_key = get_page_args(request, cursor_keys=NEXT_SERVICE_CURSOR_KEYS, owner={'user_id': user_id})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    response = get_upcoming_maintenance_records(user_id, days, page_size, start_key)
+    if 'error' in response:
+        return jsonify(response), 500
+    result = jsonify({'items': response['items']})
+    if response['next_cursor']:
+        result.headers[NEXT_CURSOR_HEADER] = response['next_cursor']
+    return result
@@ -1,9 +1,80 @@
-from flask import Blueprint, jsonify, request
-from components.s3_service import list_user_reports, get_report, get_bucket_name
+from flask import Blueprint, jsonify, request, make_response, redirect, Response
+from botocore.exceptions import ClientError
+from components.s3_service import list_user_reports, get_report_with_etag, get_cached_report_etag, get_report_etag, get_report_url, open_report_stream, get_user_history
+from components.report_keys import history_id
+from components.report_html import render_document
+from components.report_export import stream_reports_zip
+from components.report_manifest import iter_user_reports, CURSOR_KEYS, VEHICLE_CURSOR_KEYS
+from datetime import datetime
+from config import REPORT_DOWNLOAD_MODE, REPORT_PRESIGNED_URL_SECONDS, REPORT_STREAM_CHUNK_BYTES, REPORT_HTML_CACHE_MAX_CHARS
+from components.report_keys import report_key_from_name, is_user_report_key
+from components.pagination import get_page_args, NEXT_CURSOR_HEADER
+from routes.auth_routes import extract_user_id_from_token
 
 # create a blueprint for S3 routes
 s3_bp = Blueprint('s3', __name__)
 
+# reports never change once written, browsers may keep them for a year without asking again
+REPORT_CACHE_CONTROL = 'private, max-age=31536000, immutable'
+
+# helper function to add the caching headers of a report response
+def with_report_headers(response, etag):
+    response.set_etag(etag.strip('"'))
+    response.headers['Cache-Control'] = REPORT_CACHE_CONTROL
+    return response
+
+# ways a report can be downloaded, see REPORT_DOWNLOAD_MODE in config.py
+REPORT_DOWNLOAD_MODES = ('proxy', 'url', 'redirect', 'stream', 'html')
+
+# helper function to serve a report parsed from the in-process cache
+def proxy_report(report_key):
+    # answer a matching If-None-Match straight from the cache, without S3 or serialization
+    cached_etag = get_cached_report_etag(report_key)
+    if cached_etag and request.if_none_match.contains(cached_etag.strip('"')):
+        return with_report_headers(make_response('', 304), cached_etag)
+
+    report_data, etag = get_report_with_etag(report_key)  # call get_report_with_etag function in s3_service.py
+    if request.if_none_match.contains(etag.strip('"')):
+        return with_report_headers(make_response('', 304), etag)
+    return with_report_headers(jsonify(report_data), etag), 200
+
+# helper function to pipe the S3 body to the client chunk by chunk, memory use does not grow with the report size
+def stream_report(report_key):
+    cached_etag = get_cached_report_etag(report_key)
+    if cached_etag and request.if_none_match.contains(cached_etag.strip('"')):
+        return with_report_headers(make_response('', 304), cached_etag)
+
+    if_none_match = request.headers.get('If-None-Match')
+    try:
+        s3_response = open_report_stream(report_key, if_none_match)
+    except ClientError as e:
+        if e.response['Error']['Code'] in ('304', 'NotModified'):
+            # the 304 carries the object's ETag, not the client's header which may be a list or a weak tag
+            etag = e.response.get('ResponseMetadata', {}).get('HTTPHeaders', {}).get('etag') or get_report_etag(report_key)
+            return with_report_headers(make_response('', 304), etag)
+        raise
+    body = s3_response['Body']
+
+    def generate():
+        try:
+            yield from body.iter_chunks(REPORT_STREAM_CHUNK_BYTES)
+        finally:
+            body.close()  # give the connection back to the pool even if the client disconnects
+
+    response = Response(generate(), mimetype='application/json')
+    response.headers['Content-Length'] = str(s3_response['ContentLength'])
+    return with_report_headers(response, s3_response['ETag']), 200
+
+# helper function to fetch the reports of an html document one at a time, as the document reaches them
+def html_sections(report_names):
+    for report_name in report_names:
+        try:
+            report_data, etag = get_report_with_etag(report_key_from_name(report_name))
+        except ClientError as e:
+            # the response is already streaming, a report that cannot be read becomes a section saying so
+            report_data, etag = {"error": e.response['Error']['Message']}, None
+        yield etag, report_name, report_data
+
 # route to get all reports from S3 for the user
 @s3_bp.route('/api/reports', methods=['GET'])
 def get_reports():
@@ -11,17 +82,115 @@ def get_reports():
         user_id = request.args.get('user_id')  # get user_id from query parameters
         if not user_id:
             return jsonify({"error": "User ID is required"}), 400
-        reports = list_user_reports(get_bucket_name(), user_id)  # call list_user_reports function in s3_service.py
-        return jsonify(reports), 200
+        # optional 'limit' and 'cursor' query parameters, without 'limit' every report is returned
+        vehicle_id = request.args.get('vehicle_id')  # optional filter on one vehicle
+        if vehicle_id:
+            cursor_keys, owner = VEHICLE_CURSOR_KEYS, {'user_id': user_id, 'user_vehicle': f"{user_id}#{vehicle_id}"}
+        else:
+            cursor_keys, owner = CURSOR_KEYS, {'user_id': user_id}
+        try:
+            page_size, start_key = get_page_args(request, cursor_keys=cursor_keys, owner=owner)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        reports = list_user_reports(user_id, page_size, start_key, vehicle_id)  # call list_user_reports function in s3_service.py
+        if 'error' in reports:
+            return jsonify(reports), 500
+        response = jsonify(reports['items'])
+        if reports['next_cursor']:
+            response.headers[NEXT_CURSOR_HEADER] = reports['next_cursor']
+        return response, 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+# helper function to turn a 'from'/'to' date (YYYY-MM-DD) into a report id bound, raises ValueError on a bad date
+def report_id_bound(value, end_of_day=False):
+    if not value:
+        return None
+    day = datetime.strptime(value, '%Y-%m-%d').strftime('%Y%m%d')
+    # report ids are {YYYYMMDDHHMMSS}_{suffix}, '~' sorts after every id of that day
+    return f"{day}~" if end_of_day else day
+
+# route to download all reports of the user as one zip, optionally only one vehicle and/or a date range
+@s3_bp.route('/api/reports/export', methods=['GET'])
+def export_reports():
+    user_id = extract_user_id_from_token(request)  # the zip holds every report of the user, never trust a user id from the query
+    if not user_id:
+        return jsonify({"error": "Unauthorized"}), 401
+    try:
+        from_id = report_id_bound(request.args.get('from'))
+        to_id = report_id_bound(request.args.get('to'), end_of_day=True)
+    except ValueError:
+        return jsonify({"error": "Dates must be given as YYYY-MM-DD"}), 400
+    entries = iter_user_reports(user_id, request.args.get('vehicle_id'), from_id, to_id)
+    response = Response(stream_reports_zip(entries), mimetype='application/zip')
+    response.headers['Content-Disposition'] = f'attachment; filename="{user_id}_reports.zip"'
+    return response, 200
+
+# route to get an aggregated report history of the signed in user - ?vehicle_id=... or ?month=YYYY-MM
+@s3_bp.route('/api/reports/history', methods=['GET'])
+def get_report_history():
+    user_id = extract_user_id_from_token(request)
+    if not user_id:
+        return jsonify({"error": "Unauthorized"}), 401
+    vehicle_id = request.args.get('vehicle_id')
+    month = request.args.get('month')
+    if vehicle_id:
+        hid = history_id('vehicle', vehicle_id)
+    else:
+        try:
+            hid = history_id('month', datetime.strptime(month or '', '%Y-%m').strftime('%Y%m'))
+        except ValueError:
+            return jsonify({"error": "Either vehicle_id or month (YYYY-MM) is required"}), 400
+    try:
+        history, etag = get_user_history(user_id, hid)
+    except LookupError as e:
+        return jsonify({"error": str(e)}), 404
+    except ClientError as e:
+        return jsonify({"error": f"Error retrieving history: {e.response['Error']['Message']}"}), 500
+    # unlike a single report a history keeps growing, clients revalidate it with its ETag on every use
+    response = make_response('', 304) if request.if_none_match.contains(etag.strip('"')) else jsonify(history)
+    response.set_etag(etag.strip('"'))
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+# route to render several reports as one html document, reports are given as repeated 'name' query parameters
+@s3_bp.route('/api/reports/html', methods=['GET'])
+def get_reports_html():
+    user_id = extract_user_id_from_token(request)
+    if not user_id:
+        return jsonify({"error": "Unauthorized"}), 401
+    report_names = request.args.getlist('name')
+    if not report_names:
+        return jsonify({"error": "At least one report name is required"}), 400
+    # only the signed in user's own reports are rendered
+    if not all(is_user_report_key(user_id, report_key_from_name(report_name)) for report_name in report_names):
+        return jsonify({"error": "Forbidden"}), 403
+    return Response(render_document(html_sections(report_names), REPORT_HTML_CACHE_MAX_CHARS), mimetype='text/html'), 200
+
 # route to get the content of a specific report
+# optional 'mode' query parameter - proxy, url, redirect, stream or html (default REPORT_DOWNLOAD_MODE)
 @s3_bp.route('/api/reports/<path:report_name>', methods=['GET'])
 def get_report_by_name(report_name):
+    mode = request.args.get('mode', REPORT_DOWNLOAD_MODE)
+    if mode not in REPORT_DOWNLOAD_MODES:
+        return jsonify({"error": f"mode must be one of {', '.join(REPORT_DOWNLOAD_MODES)}"}), 400
     try:
-        report_key = 'reports/' + report_name # full key to uniquely identify object in s3 bucket
-        report_data = get_report(report_key)  # call get_report function in s3_service.py
-        return jsonify(report_data), 200
+        report_key = report_key_from_name(report_name) # full key to uniquely identify object in s3 bucket
+        if mode == 'url':
+            url = get_report_url(report_key, REPORT_PRESIGNED_URL_SECONDS)
+            return jsonify({"url": url, "expires_in": REPORT_PRESIGNED_URL_SECONDS}), 200
+        if mode == 'redirect':
+            response = redirect(get_report_url(report_key, REPORT_PRESIGNED_URL_SECONDS), 302)
+            response.headers['Cache-Control'] = 'no-store'  # the signed url expires, never cache the redirect
+            return response
+        if mode == 'stream':
+            return stream_report(report_key)
+        if mode == 'html':
+            report_data, etag = get_report_with_etag(report_key)  # fails with 404 before anything is streamed
+            return Response(render_document([(etag, report_name, report_data)], REPORT_HTML_CACHE_MAX_CHARS), mimetype='text/html')
+        return proxy_report(report_key)
+    except ClientError as e:
+        status = 404 if e.response['Error']['Code'] in ('NoSuchKey', '404') else 500
+        return jsonify({"error": f"Error retrieving report: {e.response['Error']['Message']}"}), status
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
\ No newline at end of file
+        return jsonify({"error": str(e)}), 500
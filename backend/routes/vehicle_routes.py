@@ -1,7 +1,9 @@
 from flask import Blueprint, request, jsonify
-from components.vehicle_table import create_vehicle, get_all_vehicles, get_vehicles_list, get_vehicle, update_vehicle, delete_vehicle
+from components.vehicle_table import create_vehicle, get_all_vehicles, get_vehicles_list, get_vehicle, update_vehicle, USER_INDEX_CURSOR_KEYS
 from routes.auth_routes import extract_user_id_from_token  
-from maintenance_utils.count_records import count_records  # importing function from PyPi library
+from components.user_counters import get_user_counts, VEHICLE_COUNT
+from components.pagination import get_page_args, NEXT_CURSOR_HEADER
+from components.cascade_delete import start_vehicle_delete
 
 #create a blueprint for vehicle routes
 vehicle_bp = Blueprint('vehicle', __name__)
@@ -27,13 +29,22 @@ def get_all_vehicles_route():
     print(f"Extracted user_id: {user_id}")  
     if not user_id:
         return jsonify({'error': 'Unauthorized'}), 401
-    response = get_all_vehicles(user_id) # call get_all_vehicles function in vehicle_table.py
+    # optional 'limit' and 'cursor' query parameters, without 'limit' every vehicle is returned
+    try:
+        page_size, start_key = get_page_args(request, cursor_keys=USER_INDEX_CURSOR_KEYS, owner={'user_id': user_id})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    response = get_all_vehicles(user_id, page_size, start_key) # call get_all_vehicles function in vehicle_table.py
 
     if 'error' in response:
         print(f"Error response: {response}")  
         return jsonify(response), 500
 
-    return jsonify(response)
+    result = jsonify(response['items'])
+    # cursor for the next page is sent as a header so the body stays a plain list
+    if response['next_cursor']:
+        result.headers[NEXT_CURSOR_HEADER] = response['next_cursor']
+    return result
 
 # route to get  list of vehicles with only vehicle_id and display_name
 @vehicle_bp.route('/vehiclesList', methods=['GET'])
@@ -41,15 +52,22 @@ def get_vehicles_list_route():
     user_id = extract_user_id_from_token(request) # extract user id from auth token
     if not user_id:
         return jsonify({'error': 'Unauthorized'}), 401
+    try:
+        page_size, start_key = get_page_args(request, cursor_keys=USER_INDEX_CURSOR_KEYS, owner={'user_id': user_id})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     # calling get_vehicles_list function  in vehicle_table.py
-    vehicles = get_vehicles_list(user_id)
+    vehicles = get_vehicles_list(user_id, page_size, start_key)
     if 'error' in vehicles:
         return jsonify(vehicles), 500
 
-    return jsonify([
+    result = jsonify([
         {'vehicle_id': vehicle['vehicle_id'], 'display_name': vehicle['display_name']}
-        for vehicle in vehicles
+        for vehicle in vehicles['items']
     ])
+    if vehicles['next_cursor']:
+        result.headers[NEXT_CURSOR_HEADER] = vehicles['next_cursor']
+    return result
 
 #route to get a specific vehicle detail using its id
 @vehicle_bp.route('/vehicles/<vehicle_id>', methods=['GET'])
@@ -80,8 +98,14 @@ def delete_vehicle_route(vehicle_id):
     user_id = extract_user_id_from_token(request) # extract user id from auth token
     if not user_id:
         return jsonify({'error': 'Unauthorized'}), 401
-    response = delete_vehicle(vehicle_id, user_id)  # call delete_vehicle function in vehicle_table.py
-    return jsonify({'message': response})
+    vehicle = get_vehicle(vehicle_id)  # call get_vehicle function in vehicle_table.py
+    if 'error' in vehicle or vehicle.get('user_id') != user_id:
+        return jsonify({'error': 'Vehicle not found.'}), 404
+    # the vehicle, its maintenance records and its reports are deleted by a background job
+    job_id = start_vehicle_delete(user_id, vehicle_id)
+    response = jsonify({'message': 'Vehicle deletion started.', 'job_id': job_id})
+    response.headers['Location'] = f"/jobs/{job_id}"
+    return response, 202
 
 # route to count total vehicles in the vehicle table
 @vehicle_bp.route('/vehicles/count', methods=['GET'])
@@ -90,7 +114,7 @@ def count_vehicles_route():
     if not user_id:
         return jsonify({'error': 'Unauthorized'}), 401
     try:
-        vehicle_count = count_records("Vehicles", user_id) # call count_records function
+        vehicle_count = get_user_counts(user_id)[VEHICLE_COUNT] # one get_item on the user's counters
         return jsonify({'vehicle_count': vehicle_count})
     except Exception as e:
         return jsonify({'error': f"Failed to count vehicles: {str(e)}"}), 500
@@ -0,0 +1,99 @@
+# latency check for POST /maintenance against a local AWS stand-in
+# run from the backend folder: python -m scripts.bench_maintenance_latency --requests 20
+import argparse
+import json
+import os
+import statistics
+import time
+
+# boto3 needs a region to build clients at import, the stand-ins below replace every network call
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+
+from components import maintenance_table, event_publisher, user_counters  # noqa: E402
+from maintenance_utils.calculate_next_service import calculate_next_service_date  # noqa: E402
+
+
+# in-memory stand-in for the DynamoDB tables and the SQS queue, every call costs one simulated round trip
+class LocalAWS:
+    def __init__(self, latency_ms):
+        self.latency = latency_ms / 1000.0
+        self.items = []
+        self.messages = []
+
+    def _round_trip(self):
+        time.sleep(self.latency)
+
+    def put_item(self, Item):
+        self._round_trip()
+        self.items.append(Item)
+
+    def update_item(self, **kwargs):
+        self._round_trip()
+
+    def get_vehicle(self, vehicle_id):
+        self._round_trip()
+        return {'vehicle_id': vehicle_id, 'make': 'Toyota', 'model': 'Corolla', 'year': '2020'}
+
+    def send_message(self, queue_name, message_body):
+        self._round_trip()
+        self.messages.append(message_body)
+        return {'MessageId': str(len(self.messages))}
+
+    def send_message_batch(self, queue_name, message_bodies):
+        self._round_trip()
+        self.messages.extend(message_bodies)
+        return []
+
+
+# the request path before this change - read vehicle, write, sleep, read vehicle again, send to SQS inline
+def legacy_create_maintenance_record(aws, sleep_seconds, user_id, vehicle_id, maintenance_type, mileage, last_service_date):
+    aws.get_vehicle(vehicle_id)
+    next_service_date = calculate_next_service_date(last_service_date, 6)
+    aws.put_item(Item={'user_id': user_id, 'vehicle_id': vehicle_id, 'next_service_date': next_service_date})
+    time.sleep(sleep_seconds)
+    vehicle_data = aws.get_vehicle(vehicle_id)
+    message = dict(vehicle_data, user_id=user_id, maintenance_type=maintenance_type, mileage=mileage,
+                   last_service_date=last_service_date, next_service_date=next_service_date)
+    aws.send_message('VehicleMaintenanceQueue', json.dumps(message))
+    return {"message": "Maintenance record added successfully."}, 201
+
+
+# helper function to time a create function over n calls, returns latencies in ms
+def measure(create, requests):
+    latencies = []
+    for i in range(requests):
+        start = time.perf_counter()
+        create('bench-user', f'vehicle-{i}', 'Oil Change', '12000', '2024-01-15')
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def report(label, latencies):
+    print(f"{label:<8} p50={statistics.median(latencies):8.1f} ms  max={max(latencies):8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare POST /maintenance latency before and after removing the blocking sleep.")
+    parser.add_argument('--requests', type=int, default=20)
+    parser.add_argument('--aws-latency-ms', type=float, default=15.0, help="simulated latency of one AWS round trip")
+    parser.add_argument('--legacy-sleep', type=float, default=1.0, help="sleep used by the old request path")
+    args = parser.parse_args()
+
+    aws = LocalAWS(args.aws_latency_ms)
+    # point the real code at the stand-in
+    maintenance_table.table = aws
+    user_counters.table = aws
+    maintenance_table.get_vehicle = aws.get_vehicle
+    event_publisher.send_sqs_message_batch = aws.send_message_batch
+
+    legacy = measure(lambda *a: legacy_create_maintenance_record(aws, args.legacy_sleep, *a), args.requests)
+    current = measure(maintenance_table.create_maintenance_record, args.requests)
+    event_publisher.flush()
+
+    report('legacy', legacy)
+    report('current', current)
+    print(f"messages delivered: {len(aws.messages)} of {2 * args.requests}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+# micro-benchmark of the html report renderer against the string concatenation it replaced
+# run from the backend folder: python -m scripts.bench_report_html --fields 5000 --runs 20
+import argparse
+import statistics
+import time
+from components.report_html import render_document
+
+
+# the renderer before this change - one += per field, nothing escaped or cached
+def legacy_json_to_html(report_data):
+    html_content = '<html><body>'
+    html_content += '<h1>Report</h1>'
+    html_content += '<ul>'
+    for key, value in report_data.items():
+        html_content += f'<li><strong>{key}:</strong> {value}</li>'
+    html_content += '</ul>'
+    html_content += '</body></html>'
+    return html_content
+
+
+# helper function to build a report with the given number of fields, every nested_every-th one nested (0 - none)
+def make_report(fields, nested_every=10):
+    report = {}
+    for index in range(fields):
+        if nested_every and index % nested_every == 0:
+            report[f'service_{index}'] = {'type': 'Oil <change>', 'mileage': index * 100, 'parts': ['filter', 'oil & gasket']}
+        else:
+            report[f'field_{index}'] = f'value {index} for "vehicle"'
+    return report
+
+
+# helper function to time a renderer, returns the median milliseconds per run
+def time_runs(render, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        render()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the streaming html renderer with the legacy json_to_html.")
+    parser.add_argument('--fields', type=int, nargs='+', default=[1000, 5000, 20000], help="report sizes to render")
+    parser.add_argument('--runs', type=int, default=20)
+    parser.add_argument('--nested-every', type=int, default=10, help="nest every n-th field, 0 for a flat report")
+    args = parser.parse_args()
+
+    print(f"{'fields':>8} {'legacy ms':>10} {'render ms':>10} {'cached ms':>10} {'first chunk ms':>15}")
+    for fields in args.fields:
+        report = make_report(fields, args.nested_every)
+        etag = f'"bench-{fields}"'
+        legacy_ms = time_runs(lambda: legacy_json_to_html(report), args.runs)
+        render_ms = time_runs(lambda: ''.join(render_document([(None, 'Report', report)], 0)), args.runs)
+        ''.join(render_document([(etag, 'Report', report)], 64 * 1024 * 1024))  # warm the cache
+        cached_ms = time_runs(lambda: ''.join(render_document([(etag, 'Report', report)], 64 * 1024 * 1024)), args.runs)
+
+        # time until the first piece of the report body can be sent to the client
+        def first_chunk():
+            document = render_document([(None, 'Report', report)], 0)
+            next(document)
+            next(document)
+        first_ms = time_runs(first_chunk, args.runs)
+        print(f"{fields:>8} {legacy_ms:>10.2f} {render_ms:>10.2f} {cached_ms:>10.2f} {first_ms:>15.2f}")
+
+
+if __name__ == "__main__":
+    main()
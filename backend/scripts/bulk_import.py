@@ -0,0 +1,27 @@
+# import vehicles and maintenance history for one user from a CSV or NDJSON file
+# run from the backend folder: python -m scripts.bulk_import --user-id alice fleet.csv
+import argparse
+import json
+import os
+from components import event_publisher
+from components.bulk_import import import_rows, FORMATS
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream a CSV or NDJSON file of vehicles and maintenance records into the tables.")
+    parser.add_argument('path')
+    parser.add_argument('--user-id', required=True, help="user the vehicles and records belong to")
+    parser.add_argument('--format', choices=FORMATS, help="defaults to the file extension")
+    args = parser.parse_args()
+
+    input_format = args.format or os.path.splitext(args.path)[1].lstrip('.').lower()
+    with open(args.path, 'rb') as stream:
+        summary = import_rows(args.user_id, stream, input_format)
+    event_publisher.flush()  # wait until every report event is on the queue before exiting
+
+    print(json.dumps(summary, indent=2))
+    print(f"published events: {event_publisher.get_stats()['messages_sent']}")
+
+
+if __name__ == "__main__":
+    main()
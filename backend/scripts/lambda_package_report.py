@@ -0,0 +1,38 @@
+# report the size and cold start cost of the report lambda package before deploying it
+# run from the backend folder: python -m scripts.lambda_package_report --max-zip-kb 512 --max-import-ms 300
+import argparse
+import sys
+from components.lambda_package import build_package, describe_package, measure_cold_start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the report lambda package and report its size and import/init time.")
+    parser.add_argument('--runs', type=int, default=3, help="cold starts to measure, the fastest is reported")
+    parser.add_argument('--max-zip-kb', type=float, help="fail if the zipped package is larger than this")
+    parser.add_argument('--max-import-ms', type=float, help="fail if importing the handler takes longer than this")
+    args = parser.parse_args()
+
+    zip_bytes = build_package()
+    package = describe_package(zip_bytes)
+    timings = [measure_cold_start(zip_bytes) for _ in range(args.runs)]
+    import_ms = min(timing['import_ms'] for timing in timings)
+    init_ms = min(timing['init_ms'] for timing in timings)
+
+    print("files:")
+    for name in package['files']:
+        print(f"  {name}")
+    print(f"zip size: {package['zip_bytes'] / 1024:.1f} KB ({package['uncompressed_bytes'] / 1024:.1f} KB uncompressed)")
+    print(f"handler import: {import_ms:.1f} ms  client init: {init_ms:.1f} ms")
+
+    failures = []
+    if args.max_zip_kb is not None and package['zip_bytes'] / 1024 > args.max_zip_kb:
+        failures.append(f"zip size is over {args.max_zip_kb} KB")
+    if args.max_import_ms is not None and import_ms > args.max_import_ms:
+        failures.append(f"handler import is over {args.max_import_ms} ms")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
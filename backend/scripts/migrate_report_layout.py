@@ -0,0 +1,59 @@
+# offline migration of reports from the flat reports/{name} layout to reports/{user_id}/{name}
+# run from the backend folder: python -m scripts.migrate_report_layout --workers 32 [--delete-source] [--dry-run]
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from components.s3_service import s3_client, get_bucket_name
+from components.report_keys import REPORTS_PREFIX, migrated_report_key
+
+
+# function to list the keys still in the flat layout, Delimiter stops the listing from descending into user folders
+def legacy_report_keys(bucket_name):
+    paginator = s3_client.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=bucket_name, Prefix=REPORTS_PREFIX, Delimiter='/'):
+        for item in page.get('Contents', []):
+            new_key = migrated_report_key(item['Key'])
+            if new_key:
+                yield item['Key'], new_key
+
+
+# function to copy one report to its new key, and remove the old object when asked to
+def migrate_report(bucket_name, old_key, new_key, delete_source):
+    s3_client.copy_object(Bucket=bucket_name, Key=new_key, CopySource={'Bucket': bucket_name, 'Key': old_key})
+    if delete_source:
+        s3_client.delete_object(Bucket=bucket_name, Key=old_key)
+    return old_key
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Copy reports into per-user prefixes.")
+    parser.add_argument('--bucket', default=None, help="defaults to the app's report bucket")
+    parser.add_argument('--workers', type=int, default=16)
+    parser.add_argument('--delete-source', action='store_true', help="delete each old object after it was copied")
+    parser.add_argument('--dry-run', action='store_true')
+    args = parser.parse_args()
+
+    bucket_name = args.bucket or get_bucket_name()
+    start = time.perf_counter()
+    copied, failed = 0, 0
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        futures = {}
+        for old_key, new_key in legacy_report_keys(bucket_name):
+            if args.dry_run:
+                print(f"{old_key} -> {new_key}")
+                continue
+            futures[executor.submit(migrate_report, bucket_name, old_key, new_key, args.delete_source)] = old_key
+        for future, old_key in futures.items():
+            try:
+                future.result()
+                copied += 1
+            except Exception as e:
+                failed += 1
+                print(f"Failed to migrate {old_key}: {e}")
+
+    elapsed = time.perf_counter() - start
+    print(f"copied: {copied}  failed: {failed}  elapsed: {elapsed:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+# standalone relay that moves MaintenanceOutbox events to SQS
+# run from the backend folder: python -m scripts.outbox_relay (set OUTBOX_RELAY_IN_APP=false on the web app)
+import argparse
+import logging
+import signal
+import threading
+from components.outbox import create_outbox_table, run_relay
+from config import OUTBOX_RELAY_INTERVAL_SECONDS
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Relay pending outbox events to their SQS queues.")
+    parser.add_argument('--interval', type=float, default=OUTBOX_RELAY_INTERVAL_SECONDS, help="seconds to wait when the outbox is empty")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    logging.info(create_outbox_table())
+
+    # stop cleanly on ctrl+c or a termination signal
+    stop_event = threading.Event()
+    signal.signal(signal.SIGINT, lambda *_: stop_event.set())
+    signal.signal(signal.SIGTERM, lambda *_: stop_event.set())
+    run_relay(stop_event, args.interval)
+
+
+if __name__ == "__main__":
+    main()
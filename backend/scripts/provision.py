@@ -0,0 +1,30 @@
+# provision every AWS resource the app needs and write the state manifest the web app starts from
+# run from the backend folder: python -m scripts.provision
+import argparse
+import logging
+import sys
+import time
+from components.provisioning import provision
+from config import STATE_MANIFEST_PATH, PROVISION_WORKERS
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Provision AWS resources concurrently and write the state manifest.")
+    parser.add_argument('--manifest', default=STATE_MANIFEST_PATH)
+    parser.add_argument('--workers', type=int, default=PROVISION_WORKERS)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    start = time.perf_counter()
+    manifest, results = provision(args.manifest, args.workers)
+    elapsed = time.perf_counter() - start
+
+    # time spent per step, slowest first
+    for name, result in sorted(results.items(), key=lambda item: -item[1]['seconds']):
+        print(f"{name:<18} {result['status']:<8} {result['seconds']:7.2f} s  {result['result']}")
+    print(f"total {elapsed:.2f} s, manifest written to {args.manifest}")
+    sys.exit(0 if all(result['status'] == 'ok' for result in results.values()) else 1)
+
+
+if __name__ == "__main__":
+    main()
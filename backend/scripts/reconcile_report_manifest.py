@@ -0,0 +1,104 @@
+# rebuild the ReportManifest table from the report bucket - adds missing entries and removes entries whose object is gone
+# run from the backend folder: python -m scripts.reconcile_report_manifest --workers 16 [--dry-run]
+import argparse
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from components.s3_service import s3_client, get_bucket_name
+from components.report_manifest import table
+from components.report_keys import REPORTS_PREFIX, report_owner, report_id_from_key, manifest_entry, is_history_id, migrated_report_key
+
+# parallel scan segments used to read the current manifest
+SCAN_SEGMENTS = 4
+
+
+# function to list every report in the bucket as {(user_id, report_id): (key, size)}
+def list_report_objects(bucket_name):
+    '''
+        a report copied by scripts.migrate_report_layout exists under its flat key and its per-user key,
+        both map to the same manifest entry, so the per-user key is kept
+    '''
+    objects = {}
+    paginator = s3_client.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=bucket_name, Prefix=REPORTS_PREFIX):
+        for item in page.get('Contents', []):
+            key = item['Key']
+            report_id = report_id_from_key(key)
+            user_id = report_owner(key.rpartition('/')[2])
+            if not report_id or not user_id:
+                continue
+            pkey = (user_id, report_id)
+            if pkey in objects and migrated_report_key(key):
+                continue  # flat copy of a report already found under its per-user key
+            objects[pkey] = (key, item['Size'])
+    return objects
+
+
+# helper function to read one segment of the manifest as {(user_id, report_id): object_key}
+def scan_segment(segment):
+    entries = {}
+    scan_kwargs = {'Segment': segment, 'TotalSegments': SCAN_SEGMENTS, 'ProjectionExpression': 'user_id, report_id, object_key'}
+    while True:
+        response = table.scan(**scan_kwargs)
+        for item in response.get('Items', []):
+            if is_history_id(item['report_id']):
+                continue  # history entries are maintained by the report lambda, their objects are not single reports
+            entries[(item['user_id'], item['report_id'])] = item['object_key']
+        if 'LastEvaluatedKey' not in response:
+            return entries
+        scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+# function to build the manifest entry of an object, from its metadata or (for older objects) its content
+def build_entry(bucket_name, key, size):
+    user_id = report_owner(key.rpartition('/')[2])
+    metadata = s3_client.head_object(Bucket=bucket_name, Key=key).get('Metadata', {})
+    vehicle_id = metadata.get('vehicle-id', '')
+    maintenance_type = metadata.get('maintenance-type')
+    if maintenance_type is None:
+        report = json.loads(s3_client.get_object(Bucket=bucket_name, Key=key)['Body'].read())
+        maintenance_type = report.get('maintenance_type', '') if isinstance(report, dict) else ''
+    return manifest_entry(user_id, report_id_from_key(key), vehicle_id, maintenance_type, key, size)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconcile the ReportManifest table with the report bucket.")
+    parser.add_argument('--bucket', default=None, help="defaults to the app's report bucket")
+    parser.add_argument('--workers', type=int, default=16)
+    parser.add_argument('--dry-run', action='store_true')
+    args = parser.parse_args()
+
+    bucket_name = args.bucket or get_bucket_name()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        objects_future = executor.submit(list_report_objects, bucket_name)
+        manifest = {}
+        for entries in executor.map(scan_segment, range(SCAN_SEGMENTS)):
+            manifest.update(entries)
+        objects = objects_future.result()
+
+        # compared on the table's key, an entry pointing at another copy of its report is rewritten
+        missing = [pkey for pkey, (key, _) in objects.items() if manifest.get(pkey) != key]
+        stale = [pkey for pkey in manifest if pkey not in objects]
+        print(f"objects: {len(objects)}  manifest entries: {len(manifest)}  missing: {len(missing)}  stale: {len(stale)}")
+        if args.dry_run:
+            return
+
+        failed = 0
+        # overwrite_by_pkeys keeps a batch from ever holding two writes of the same entry
+        with table.batch_writer(overwrite_by_pkeys=['user_id', 'report_id']) as batch:
+            futures = [(objects[pkey][0], executor.submit(build_entry, bucket_name, *objects[pkey])) for pkey in missing]
+            for key, future in futures:
+                try:
+                    batch.put_item(Item=future.result())
+                except Exception as e:
+                    failed += 1
+                    print(f"Failed to rebuild entry for {key}: {e}")
+            for user_id, report_id in stale:
+                batch.delete_item(Key={'user_id': user_id, 'report_id': report_id})
+
+    print(f"written: {len(missing) - failed}  removed: {len(stale)}  failed: {failed}  elapsed: {time.perf_counter() - start:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
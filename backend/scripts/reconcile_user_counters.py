@@ -0,0 +1,80 @@
+# recompute the per-user vehicle and maintenance counters from the tables and repair the ones that drifted
+# run from the backend folder: python -m scripts.reconcile_user_counters --segments 8 [--dry-run]
+import argparse
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from components import vehicle_table, maintenance_table, user_counters
+from components.user_counters import VEHICLE_COUNT, MAINTENANCE_COUNT, COUNTERS
+
+
+# helper function to count the items of one scan segment per user
+def count_segment(table, segment, total_segments):
+    counts = Counter()
+    scan_kwargs = {'Segment': segment, 'TotalSegments': total_segments, 'ProjectionExpression': 'user_id'}
+    while True:
+        response = table.scan(**scan_kwargs)
+        counts.update(item['user_id'] for item in response.get('Items', []))
+        if 'LastEvaluatedKey' not in response:
+            return counts
+        scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+# helper function to read one segment of the current counters as {user_id: {counter: value}}
+def read_counters_segment(segment, total_segments):
+    counters = {}
+    scan_kwargs = {'Segment': segment, 'TotalSegments': total_segments}
+    while True:
+        response = user_counters.table.scan(**scan_kwargs)
+        for item in response.get('Items', []):
+            counters[item['user_id']] = {name: int(item.get(name, 0)) for name in COUNTERS}
+        if 'LastEvaluatedKey' not in response:
+            return counters
+        scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recompute the UserCounters table with a parallel scan and repair drift.")
+    parser.add_argument('--segments', type=int, default=4, help="parallel scan segments per table")
+    parser.add_argument('--dry-run', action='store_true')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    segments = range(args.segments)
+    with ThreadPoolExecutor(max_workers=args.segments * 3) as executor:
+        vehicle_futures = [executor.submit(count_segment, vehicle_table.table, segment, args.segments) for segment in segments]
+        maintenance_futures = [executor.submit(count_segment, maintenance_table.table, segment, args.segments) for segment in segments]
+        counter_futures = [executor.submit(read_counters_segment, segment, args.segments) for segment in segments]
+
+        expected = {}
+        for counter_name, futures in ((VEHICLE_COUNT, vehicle_futures), (MAINTENANCE_COUNT, maintenance_futures)):
+            for future in futures:
+                for user_id, count in future.result().items():
+                    expected.setdefault(user_id, dict.fromkeys(COUNTERS, 0))[counter_name] += count
+        current = {}
+        for future in counter_futures:
+            current.update(future.result())
+
+    # users whose counters exist but who have no items left go back to 0
+    zero = dict.fromkeys(COUNTERS, 0)
+    drifted = {user_id: expected.get(user_id, zero) for user_id in set(expected) | set(current)
+               if expected.get(user_id, zero) != current.get(user_id, zero)}
+    print(f"users: {len(expected)}  counter items: {len(current)}  drifted: {len(drifted)}")
+    for user_id, counts in sorted(drifted.items()):
+        print(f"  {user_id}: {current.get(user_id, zero)} -> {counts}")
+    if args.dry_run:
+        return
+
+    # writes that land while the scan runs can make a repaired counter off by those writes, run again when idle
+    failed = 0
+    for user_id, counts in drifted.items():
+        try:
+            user_counters.set_user_counts(user_id, counts)
+        except Exception as e:
+            failed += 1
+            print(f"Failed to repair counters of {user_id}: {e}")
+    print(f"repaired: {len(drifted) - failed}  failed: {failed}  elapsed: {time.perf_counter() - start:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
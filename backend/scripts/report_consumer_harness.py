@@ -0,0 +1,126 @@
+# local harness for the report lambda - feeds synthetic SQS batches to the handler and reports records per second
+# run from the backend folder: python -m scripts.report_consumer_harness --records 1000 --batch-size 10
+import argparse
+import io
+import json
+import os
+import threading
+import time
+import uuid
+
+# boto3 needs a region to build clients at import, the S3 stand-in below replaces every network call
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+
+from components import report_handler  # noqa: E402
+
+
+# in-memory stand-in for the S3 client, put_object costs one simulated round trip
+class LocalS3:
+    def __init__(self, latency_ms, failure_rate):
+        self.latency = latency_ms / 1000.0
+        self.failure_rate = failure_rate
+        self.objects = {}
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def put_object(self, Bucket, Key, Body, Metadata=None):
+        time.sleep(self.latency)
+        with self.lock:
+            self.calls += 1
+            fail = self.failure_rate and self.calls % round(1 / self.failure_rate) == 0
+            if not fail:
+                self.objects[Key] = Body
+        if fail:
+            raise RuntimeError("simulated S3 failure")
+
+    def get_object(self, Bucket, Key):
+        time.sleep(self.latency)
+        with self.lock:
+            return {'Body': io.BytesIO(self.objects[Key])}
+
+    def delete_object(self, Bucket, Key):
+        time.sleep(self.latency)
+        with self.lock:
+            self.objects.pop(Key, None)
+
+
+# error raised by the DynamoDB stand-in when a conditional write fails, shaped like botocore's ClientError
+class ConditionalCheckFailed(Exception):
+    response = {'Error': {'Code': 'ConditionalCheckFailedException'}}
+
+
+# in-memory stand-in for the DynamoDB client, records manifest entries keyed by user_id and report_id
+# only understands the version condition used by history appends
+class LocalDynamoDB:
+    def __init__(self, latency_ms):
+        self.latency = latency_ms / 1000.0
+        self.items = {}
+        self.lock = threading.Lock()
+
+    def get_item(self, TableName, Key, ConsistentRead=False):
+        time.sleep(self.latency)
+        with self.lock:
+            item = self.items.get((Key['user_id']['S'], Key['report_id']['S']))
+        return {'Item': item} if item else {}
+
+    def put_item(self, TableName, Item, ConditionExpression=None, ExpressionAttributeValues=None):
+        time.sleep(self.latency)
+        key = (Item['user_id']['S'], Item['report_id']['S'])
+        with self.lock:
+            current = self.items.get(key)
+            if ConditionExpression and current and current['version'] != ExpressionAttributeValues[':version']:
+                raise ConditionalCheckFailed()
+            self.items[key] = Item
+
+
+# function to build one synthetic SQS record in the shape lambda receives
+def make_record(index):
+    body = {
+        'user_id': f'user-{index % 50}',
+        'vehicle_id': f'vehicle-{index % 200}',
+        'make': 'Toyota',
+        'model': 'Corolla',
+        'year': '2020',
+        'maintenance_type': 'Oil Change',
+        'mileage': str(10000 + index),
+        'last_service_date': '2024-01-15',
+        'next_service_date': '2024-07-15'
+    }
+    return {
+        'messageId': str(uuid.uuid4()),
+        'body': json.dumps(body),
+        'attributes': {'SentTimestamp': str(int(time.time() * 1000))},
+        'eventSource': 'aws:sqs'
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Feed synthetic SQS batches to the report lambda handler.")
+    parser.add_argument('--records', type=int, default=1000)
+    parser.add_argument('--batch-size', type=int, default=10)
+    parser.add_argument('--s3-latency-ms', type=float, default=20.0, help="simulated latency of one put_object")
+    parser.add_argument('--failure-rate', type=float, default=0.0, help="fraction of put_object calls that fail")
+    parser.add_argument('--aggregation', choices=['', 'vehicle', 'month'], default='', help="append to histories instead")
+    args = parser.parse_args()
+
+    report_handler.REPORT_AGGREGATION = args.aggregation
+
+    s3 = LocalS3(args.s3_latency_ms, args.failure_rate)
+    report_handler.clients['s3'] = s3
+    report_handler.clients['dynamodb'] = LocalDynamoDB(args.s3_latency_ms / 2)
+
+    records = [make_record(index) for index in range(args.records)]
+    failures = 0
+    start = time.perf_counter()
+    for offset in range(0, len(records), args.batch_size):
+        result = report_handler.lambda_handler({'Records': records[offset:offset + args.batch_size]}, None)
+        failures += len(result['batchItemFailures'])
+    elapsed = time.perf_counter() - start
+
+    print(f"records: {args.records}  batch size: {args.batch_size}  workers: {report_handler.REPORT_WORKERS}")
+    print(f"failed (returned for retry): {failures}  objects in bucket: {len(s3.objects)}  S3 requests: {s3.calls} puts")
+    print(f"elapsed: {elapsed:.2f} s  throughput: {args.records / elapsed:.1f} records/s")
+
+
+if __name__ == "__main__":
+    main()